@@ -1,7 +1,9 @@
 import streamlit as st
+import hashlib
 import json
-import re
-from pathlib import Path
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,10 +11,18 @@ load_dotenv()
 # -----------------------------
 # Core Imports
 # -----------------------------
-from core.loader import load_excel_tickets
-from core.grouping import group_by_similarity
-from core.analysis import analyse_group
-from core.embeddings import embed_texts
+from core.loader import load_tickets
+from core.analysis_cache import AnalysisCache
+from core.embedding_cache import EmbeddingCache
+from core.instrumentation import RunReport, activate
+from core.jobs import AnalysisJob
+from core.offline_store import (
+    DEFAULT_STORE_PATH,
+    LEGACY_JSON_PATH,
+    OfflineStore,
+    convert_json_results,
+)
+from core.result_cache import DEFAULT_SPILL_DIR, ResultCache, result_key
 
 
 # -----------------------------
@@ -20,30 +30,69 @@ from core.embeddings import embed_texts
 # -----------------------------
 MAX_DISTANCE = 0.35
 MAX_DESCRIPTIONS_PER_GROUP = 8
-OFFLINE_RESULTS_PATH = Path("data/offline/offline_results.json")
+OFFLINE_RESULTS_PATH = DEFAULT_STORE_PATH
+OFFLINE_JSON_PATH = LEGACY_JSON_PATH  # older format, converted on first use
+OFFLINE_GROUPS_PER_PAGE = 50
+POLL_SECONDS = 1.0  # how often a running analysis job refreshes the page
+JOB_WORKERS = 2  # online analyses that can run at once across sessions
+RESULT_CACHE_BYTES = 1024 * 1024 * 1024  # parsed tickets, embeddings, groups
+RESULT_CACHE_SPILL_DIR = DEFAULT_SPILL_DIR  # None keeps results in memory only
 
 
 # -----------------------------
-# Responsible AI Sanitiser
+# Shared Resources
 # -----------------------------
-def sanitize_text(text: str) -> str:
+@st.cache_resource
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    One on-disk embedding cache shared by every session.
+    """
+    return EmbeddingCache()
+
+
+@st.cache_resource
+def get_analysis_cache() -> AnalysisCache:
+    """
+    One on-disk LLM analysis cache shared by every session.
+    """
+    return AnalysisCache()
+
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """
+    Parsed tickets, embeddings and groups by upload hash, shared by every
+    session and rerun.
+    """
+    return ResultCache(RESULT_CACHE_BYTES, spill_dir=RESULT_CACHE_SPILL_DIR)
+
+
+@st.cache_resource
+def get_offline_store(path: str, modified: float) -> OfflineStore:
     """
-    Removes sensitive information before sending to LLM.
+    Open offline results once per file version (modified is the file's
+    mtime, so a regenerated store is reopened).
     """
+    return OfflineStore(path)
 
-    # Emails
-    text = re.sub(r'\b[\w\.-]+@[\w\.-]+\.\w+\b', '[REDACTED_EMAIL]', text)
 
-    # IP Addresses
-    text = re.sub(r'\b(?:\d{1,3}\.){3}\d{1,3}\b', '[REDACTED_IP]', text)
+def open_offline_store() -> OfflineStore | None:
+    if not OFFLINE_RESULTS_PATH.exists():
+        if not OFFLINE_JSON_PATH.exists():
+            return None
+        convert_json_results(OFFLINE_JSON_PATH, OFFLINE_RESULTS_PATH)
 
-    # Server / Hostnames (basic pattern)
-    text = re.sub(r'\b(?:srv|server|host)[\w\-\.]*\b', '[REDACTED_HOST]', text, flags=re.IGNORECASE)
+    return get_offline_store(
+        str(OFFLINE_RESULTS_PATH), OFFLINE_RESULTS_PATH.stat().st_mtime
+    )
 
-    # Password-like fields
-    text = re.sub(r'password\s*[:=]\s*\S+', 'password=[REDACTED]', text, flags=re.IGNORECASE)
 
-    return text
+@st.cache_resource
+def get_job_pool() -> ThreadPoolExecutor:
+    """
+    Worker pool that runs online analysis jobs off the script thread.
+    """
+    return ThreadPoolExecutor(max_workers=JOB_WORKERS)
 
 
 # -----------------------------
@@ -73,26 +122,48 @@ min_group_size = st.sidebar.slider(
 )
 
 
+refresh_analysis = st.sidebar.checkbox(
+    "Force refresh LLM analysis",
+    value=False,
+    help="Ignore cached analyses and query the LLM again (online mode)"
+)
+
+
 # -----------------------------
 # File Upload
 # -----------------------------
 uploaded_file = st.file_uploader(
-    "Upload service ticket Excel file (.xlsx)",
-    type=["xlsx"]
+    "Upload service ticket export (.xlsx, .csv or .parquet)",
+    type=["xlsx", "csv", "parquet"]
 )
 
 if uploaded_file is None:
-    st.info("Please upload an Excel file to begin.")
+    st.info("Please upload a ticket export to begin.")
     st.stop()
 
-if not st.button("🚀 Run Analysis"):
+upload_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+# Remember the run across reruns, so widgets don't reset the results
+if st.button("🚀 Run Analysis"):
+    st.session_state["run_upload"] = upload_hash
+    # An explicit click starts a fresh job (cached results make it quick)
+    st.session_state.pop("analysis_job_key", None)
+
+if st.session_state.get("run_upload") != upload_hash:
     st.stop()
 
 
 # -----------------------------
 # Load Tickets
 # -----------------------------
-tickets = load_excel_tickets(uploaded_file)
+run_report = RunReport("app")
+
+with activate(run_report), run_report.stage("load"):
+    tickets = get_result_cache().get_or_compute(
+        result_key("tickets", upload_hash=upload_hash),
+        lambda: load_tickets(uploaded_file)
+    )
+
 st.success(f"Loaded {len(tickets)} tickets")
 
 
@@ -101,33 +172,40 @@ st.success(f"Loaded {len(tickets)} tickets")
 # =====================================================
 if mode == "Offline (Pre-generated Results)":
 
-    if not OFFLINE_RESULTS_PATH.exists():
-        st.error("offline_results.json not found in data/offline/")
+    try:
+        offline_store = open_offline_store()
+    except (OSError, ValueError, sqlite3.Error) as e:
+        st.error(f"Offline results could not be read: {e}")
         st.stop()
 
-    with open(OFFLINE_RESULTS_PATH, "r", encoding="utf-8") as f:
-        offline_results = json.load(f)
-
-    if not isinstance(offline_results, list):
-        st.error("offline_results.json format invalid.")
+    if offline_store is None:
+        st.error("Offline results not found in data/offline/")
         st.stop()
 
-    # Apply minimum group size filter
-    meaningful_groups = [
-        g for g in offline_results
-        if len(g.get("tickets", [])) >= min_group_size
-    ]
+    # Apply minimum group size filter (in the store, by its size column)
+    group_count = offline_store.count(min_size=min_group_size)
+
+    st.success(f"Found {group_count} meaningful groups")
 
-    st.success(f"Found {len(meaningful_groups)} meaningful groups")
+    page_count = max(1, -(-group_count // OFFLINE_GROUPS_PER_PAGE))
+    page = 1
+    if page_count > 1:
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1)
+
+    meaningful_groups = offline_store.groups(
+        min_size=min_group_size,
+        limit=OFFLINE_GROUPS_PER_PAGE,
+        offset=(page - 1) * OFFLINE_GROUPS_PER_PAGE
+    )
 
     for group_data in meaningful_groups:
 
         group_number = group_data.get("group_number", "?")
-        tickets_in_group = group_data.get("tickets", [])
+        group_size = group_data.get("size", 0)
         analysis = group_data.get("analysis", {})
 
         with st.expander(
-            f"📌 Group {group_number} ({len(tickets_in_group)} tickets)",
+            f"📌 Group {group_number} ({group_size} tickets)",
             expanded=False
         ):
 
@@ -157,9 +235,11 @@ if mode == "Offline (Pre-generated Results)":
 
             st.subheader("📄 Tickets in this group")
 
-            for ticket in tickets_in_group:
-                st.markdown("---")
-                st.text(ticket.get("display_text", "No display text"))
+            # Expander bodies always run, so tickets load only on request
+            if st.toggle("Show tickets", key=f"offline_tickets_{group_number}"):
+                for ticket in offline_store.tickets(group_number):
+                    st.markdown("---")
+                    st.text(ticket.get("display_text") or "No display text")
 
 
 # =====================================================
@@ -169,67 +249,132 @@ else:
 
     st.info("Running in ONLINE mode (OpenAI required)")
 
-    embedding_texts = [t["embedding_text"] for t in tickets]
-    embeddings = embed_texts(embedding_texts)
+    # One background job per upload; reruns (e.g. moving the slider)
+    # reuse its results instead of embedding and analysing again
+    job_key = (upload_hash, refresh_analysis)
+    job = st.session_state.get("analysis_job")
 
-    groups, _ = group_by_similarity(embeddings, tickets, MAX_DISTANCE)
+    if job is None or st.session_state.get("analysis_job_key") != job_key:
+        if job is not None:
+            job.cancel()
 
-    meaningful_groups = [
-        g for g in groups
-        if len(g) >= min_group_size
-    ]
+        job = AnalysisJob(
+            tickets,
+            MAX_DISTANCE,
+            MAX_DESCRIPTIONS_PER_GROUP,
+            embedding_cache=get_embedding_cache(),
+            analysis_cache=get_analysis_cache(),
+            refresh=refresh_analysis,
+            report=RunReport("app-job"),
+            result_cache=get_result_cache(),
+            upload_hash=upload_hash
+        ).start(get_job_pool())
 
-    st.success(f"Found {len(meaningful_groups)} meaningful groups")
+        st.session_state["analysis_job"] = job
+        st.session_state["analysis_job_key"] = job_key
 
-    for idx, group in enumerate(meaningful_groups, start=1):
+    snapshot = job.snapshot()
 
-        with st.expander(
-            f"📌 Group {idx} ({len(group)} tickets)",
-            expanded=False
-        ):
+    if snapshot["error"] is not None:
+        st.error(f"LLM Error: {str(snapshot['error'])}")
 
-            # Apply sanitisation BEFORE sending to LLM
-            descriptions = [
-                sanitize_text(tickets[i]["embedding_text"])
-                for i in group[:MAX_DESCRIPTIONS_PER_GROUP]
-            ]
+    if snapshot["stage"] in ("queued", "deduplicating", "embedding", "grouping"):
+        st.progress(0.0, text=f"{snapshot['stage'].capitalize()} tickets...")
 
-            try:
-                analysis = analyse_group(descriptions)
-            except Exception as e:
-                st.error(f"LLM Error: {str(e)}")
-                analysis = None
+    else:
+        cached = snapshot["embeddings_cached"]
+        requested = snapshot["representatives"] - cached
+        st.caption(f"Embeddings: {cached} cached, {requested} requested")
 
-            st.subheader("🧠 LLM Analysis")
+        meaningful_groups = [
+            (index, group) for index, group in enumerate(snapshot["groups"])
+            if len(group) >= min_group_size
+        ]
 
-            if isinstance(analysis, dict) and "error" not in analysis:
-                st.markdown(f"### 📌 {analysis.get('group_label', 'No label')}")
-                st.markdown("**Summary**")
-                st.write(analysis.get("summary", ""))
+        st.success(f"Found {len(meaningful_groups)} meaningful groups")
 
-                if analysis.get("common_patterns"):
-                    st.markdown("**Common Patterns**")
-                    for item in analysis["common_patterns"]:
-                        st.write(f"- {item}")
+        finished = len(snapshot["analyses"]) + len(snapshot["errors"])
+        if not job.done and snapshot["groups"]:
+            st.progress(
+                finished / len(snapshot["groups"]),
+                text=f"Analysed {finished}/{len(snapshot['groups'])} groups"
+            )
 
-                if analysis.get("hypotheses"):
-                    st.markdown("**Hypotheses**")
-                    for item in analysis["hypotheses"]:
-                        st.write(f"- {item}")
+        for idx, (index, group) in enumerate(meaningful_groups, start=1):
 
-                if analysis.get("recommended_checks"):
-                    st.markdown("**Recommended Checks**")
-                    for item in analysis["recommended_checks"]:
-                        st.write(f"- {item}")
+            with st.expander(
+                f"📌 Group {idx} ({len(group)} tickets)",
+                expanded=False
+            ):
 
-            elif isinstance(analysis, dict) and "error" in analysis:
-                st.error("LLM returned parsing error.")
-                st.text(analysis.get("raw_response", ""))
-            else:
-                st.warning("LLM analysis unavailable.")
+                st.subheader("🧠 LLM Analysis")
 
-            st.subheader("📄 Tickets in this group")
+                analysis = snapshot["analyses"].get(index)
+
+                if index in snapshot["errors"]:
+                    st.error(f"LLM Error: {snapshot['errors'][index]}")
+
+                elif isinstance(analysis, dict) and "error" not in analysis:
+                    st.markdown(f"### 📌 {analysis.get('group_label', 'No label')}")
+                    st.markdown("**Summary**")
+                    st.write(analysis.get("summary", ""))
+
+                    if analysis.get("common_patterns"):
+                        st.markdown("**Common Patterns**")
+                        for item in analysis["common_patterns"]:
+                            st.write(f"- {item}")
+
+                    if analysis.get("hypotheses"):
+                        st.markdown("**Hypotheses**")
+                        for item in analysis["hypotheses"]:
+                            st.write(f"- {item}")
+
+                    if analysis.get("recommended_checks"):
+                        st.markdown("**Recommended Checks**")
+                        for item in analysis["recommended_checks"]:
+                            st.write(f"- {item}")
+
+                elif isinstance(analysis, dict) and "error" in analysis:
+                    st.error("LLM returned parsing error.")
+                    st.text(analysis.get("raw_response", ""))
+                elif job.done:
+                    st.warning("LLM analysis unavailable.")
+                else:
+                    st.info("Analysis in progress...")
+
+                st.subheader("📄 Tickets in this group")
 
-            for i in group:
-                st.markdown("---")
-                st.text(tickets[i]["display_text"])
+                for i in group:
+                    st.markdown("---")
+                    st.text(tickets[i]["display_text"])
+
+
+# -----------------------------
+# Pipeline Timings
+# -----------------------------
+timing_reports = [run_report]
+if mode != "Offline (Pre-generated Results)":
+    timing_reports.append(job.report)
+
+with st.expander("⏱️ Pipeline timings", expanded=False):
+    st.dataframe(
+        [stage for report in timing_reports for stage in list(report.stages)],
+        use_container_width=True
+    )
+    total = sum(report.to_dict()["total_seconds"] for report in timing_reports)
+    st.caption(f"Total: {total:.2f} s")
+    st.download_button(
+        "Download run report (JSON)",
+        data=json.dumps([report.to_dict() for report in timing_reports], indent=2),
+        file_name="run_report.json",
+        mime="application/json"
+    )
+
+
+# -----------------------------
+# Background Job Polling
+# -----------------------------
+# Rerun until the online job finishes, rendering groups as they complete
+if mode != "Offline (Pre-generated Results)" and not job.done:
+    time.sleep(POLL_SECONDS)
+    st.rerun()
@@ -0,0 +1,134 @@
+"""
+Benchmark group_by_similarity from 1k to 100k synthetic tickets.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_grouping
+    python -m benchmarks.bench_grouping --sizes 1000 5000 --dim 1536
+    python -m benchmarks.bench_grouping --method faiss --index-type hnsw
+
+Sizes up to --verify-up-to are also run through the original pure-Python
+grouping loop and the groups are checked for equality.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_distances
+
+from core.grouping import (
+    ASSET_BOOST,
+    BLOCK_SIZE,
+    GROUPING_METHODS,
+    group_by_similarity,
+    share_asset,
+)
+from core.retriever import INDEX_TYPES
+
+
+MAX_DISTANCE = 0.35
+
+
+def synthetic_corpus(n: int, dim: int, seed: int = 42):
+    """
+    Clustered unit vectors plus tickets that mention a few shared hosts.
+    """
+    rng = np.random.default_rng(seed)
+
+    n_themes = max(10, n // 50)
+    centroids = rng.normal(size=(n_themes, dim))
+    themes = rng.integers(0, n_themes, size=n)
+
+    embeddings = centroids[themes] + rng.normal(scale=0.6, size=(n, dim))
+
+    n_hosts = max(8, n // 20)
+    hosts = rng.integers(0, n_hosts, size=n)
+    tickets = [
+        {"assets": [f"srv-app-{h:05d}"] if h % 3 else []}
+        for h in hosts
+    ]
+
+    return embeddings, tickets
+
+
+def legacy_group_by_similarity(embeddings, tickets, max_distance):
+    """
+    The original O(n^2) Python implementation, kept for verification.
+    """
+    distance_matrix = cosine_distances(embeddings)
+    n = len(embeddings)
+
+    visited = set()
+    groups = []
+
+    for i in range(n):
+        if i in visited:
+            continue
+
+        stack = [i]
+        group = set()
+
+        while stack:
+            current = stack.pop()
+            if current in visited:
+                continue
+
+            visited.add(current)
+            group.add(current)
+
+            for j in range(n):
+                if j in visited:
+                    continue
+
+                distance = distance_matrix[current][j]
+                if share_asset(tickets[current]["assets"], tickets[j]["assets"]):
+                    distance -= ASSET_BOOST
+
+                if distance <= max_distance:
+                    stack.append(j)
+
+        groups.append(sorted(group))
+
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--method", choices=GROUPING_METHODS, default="exact")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--verify-up-to", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'tickets':>10} {'groups':>8} {'vectorized (s)':>15} {'legacy (s)':>11}")
+
+    for n in args.sizes:
+        embeddings, tickets = synthetic_corpus(n, args.dim)
+
+        start = time.perf_counter()
+        groups, _ = group_by_similarity(
+            embeddings,
+            tickets,
+            MAX_DISTANCE,
+            block_size=args.block_size,
+            return_distances=False,
+            method=args.method,
+            index_type=args.index_type
+        )
+        elapsed = time.perf_counter() - start
+
+        legacy = "-"
+        if n <= args.verify_up_to:
+            start = time.perf_counter()
+            expected = legacy_group_by_similarity(embeddings, tickets, MAX_DISTANCE)
+            legacy = f"{time.perf_counter() - start:.2f}"
+            assert groups == expected, f"groups differ from legacy at n={n}"
+
+        print(f"{n:>10} {len(groups):>8} {elapsed:>15.2f} {legacy:>11}")
+
+
+if __name__ == "__main__":
+    main()
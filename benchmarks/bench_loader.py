@@ -0,0 +1,148 @@
+"""
+Benchmark the ticket loader on a large synthetic export.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_loader
+    python -m benchmarks.bench_loader --rows 100000 --xlsx-rows 20000
+
+Compares the original df.iterrows() loop with the column-wise loader on
+the same DataFrame, then times whole-file loads of CSV, Parquet and a
+(smaller) streamed .xlsx export.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core.loader import (
+    extract_assets,
+    find_description_fields,
+    load_tickets,
+    tickets_from_frame,
+)
+
+
+THEMES = [
+    "vpn disconnects every few minutes on {host}",
+    "password reset email not received for {user}",
+    "outlook crashes when opening shared calendar",
+    "high cpu on {host} ({ip}) after patching",
+    "printer on floor 3 shows offline",
+    "mfa push not received, login via https://{host}/auth fails",
+]
+
+
+def synthetic_export(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    hosts = [f"srv-app-{i:03d}" for i in range(200)]
+    users = [f"user{i}@company.com" for i in range(500)]
+    descriptions = [
+        THEMES[t].format(
+            host=hosts[h],
+            user=users[u],
+            ip=f"10.24.{h % 255}.{u % 255}"
+        )
+        for t, h, u in zip(
+            rng.integers(0, len(THEMES), rows),
+            rng.integers(0, len(hosts), rows),
+            rng.integers(0, len(users), rows)
+        )
+    ]
+
+    return pd.DataFrame({
+        "Ticket ID": [f"TICK-{i:07d}" for i in range(rows)],
+        "Date Created": pd.Timestamp("2025-01-01")
+        + pd.to_timedelta(rng.integers(0, 90, rows), unit="D"),
+        "Description": descriptions,
+        "Status": rng.choice(["Open", "Closed", "In Progress"], rows),
+        "Priority": rng.choice(["Low", "Medium", "High"], rows),
+        "Department": rng.choice(["Finance", "Sales", "Operations"], rows),
+        "Assigned To": [f"Agent-{i:02d}" for i in rng.integers(1, 30, rows)],
+    })
+
+
+def legacy_tickets_from_frame(df: pd.DataFrame) -> list[dict]:
+    """
+    The original df.iterrows() loader body, kept for comparison.
+    """
+    tickets = []
+
+    for _, row in df.iterrows():
+        row_dict = row.to_dict()
+
+        canonical_description = find_description_fields(row_dict)
+        if canonical_description is None:
+            canonical_description = "no description provided"
+
+        tickets.append({
+            "ticket_id": row_dict.get("Ticket ID"),
+            "display_text": (
+                f"Ticket Summary\n"
+                f"--------------\n"
+                f"Ticket ID: {row_dict.get('Ticket ID')}\n"
+                f"Date Created: {row_dict.get('Date Created')}\n"
+                f"Department: {row_dict.get('Department')}\n"
+                f"Assigned To: {row_dict.get('Assigned To')}\n"
+                f"Priority: {row_dict.get('Priority')}\n"
+                f"Status: {row_dict.get('Status')}\n\n"
+                f"Issue Description:\n"
+                f"{canonical_description}"
+            ),
+            "embedding_text": canonical_description,
+            "assets": extract_assets(canonical_description)
+        })
+
+    return tickets
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<36} {time.perf_counter() - start:>8.2f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--xlsx-rows", type=int, default=50_000)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    df = synthetic_export(args.rows)
+    print(f"{args.rows} rows")
+
+    tickets = timed("column-wise loader (DataFrame)", lambda: tickets_from_frame(df))
+
+    if not args.skip_legacy:
+        legacy = timed("iterrows loader (DataFrame)", lambda: legacy_tickets_from_frame(df))
+        assert [t["display_text"] for t in tickets] == [t["display_text"] for t in legacy]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "export.csv"
+        df.to_csv(csv_path, index=False)
+        timed("load_tickets (.csv)", lambda: load_tickets(csv_path))
+        timed("load_tickets (.csv, streamed)", lambda: load_tickets(csv_path, chunk_size=50_000))
+
+        try:
+            parquet_path = Path(tmp) / "export.parquet"
+            df.to_parquet(parquet_path)
+            timed("load_tickets (.parquet)", lambda: load_tickets(parquet_path))
+        except ImportError:
+            print("pyarrow not installed, skipping Parquet")
+
+        xlsx_path = Path(tmp) / "export.xlsx"
+        df.head(args.xlsx_rows).to_excel(xlsx_path, index=False)
+        print(f"{args.xlsx_rows} rows in .xlsx")
+        timed("load_tickets (.xlsx)", lambda: load_tickets(xlsx_path))
+        timed("load_tickets (.xlsx, streamed)", lambda: load_tickets(xlsx_path, chunk_size=10_000))
+
+
+if __name__ == "__main__":
+    main()
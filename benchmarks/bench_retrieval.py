@@ -0,0 +1,67 @@
+"""
+Compare TicketRetriever.find_similar_batch with per-query find_similar.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --sizes 10000 --dim 1536 --metric cosine
+
+Each size builds an index of that many tickets and queries every one of
+them. Sizes up to --verify-up-to also check both paths return the same
+neighbours.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from core.retriever import INDEX_TYPES, TicketRetriever
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--max-results", type=int, default=10)
+    parser.add_argument("--metric", choices=["l2", "cosine"], default="l2")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--verify-up-to", type=int, default=10_000)
+    args = parser.parse_args()
+
+    threshold = 1.1 if args.metric == "l2" else 0.35
+    rng = np.random.default_rng(42)
+
+    print(f"{'queries':>10} {'per-query (s)':>14} {'batch (s)':>10} {'speed-up':>9}")
+
+    for n in args.sizes:
+        embeddings = rng.normal(size=(n, args.dim)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        retriever = TicketRetriever(
+            embeddings, [], metric=args.metric, index_type=args.index_type
+        )
+
+        start = time.perf_counter()
+        single = [
+            retriever.find_similar(q, args.max_results, threshold)
+            for q in range(n)
+        ]
+        per_query = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lims, indices, _ = retriever.find_similar_batch(
+            np.arange(n), args.max_results, threshold
+        )
+        batch = time.perf_counter() - start
+
+        if n <= args.verify_up_to:
+            for q in range(n):
+                expected = [int(idx) for idx, _ in single[q]]
+                assert indices[lims[q]:lims[q + 1]].tolist() == expected, f"query {q} differs"
+
+        print(f"{n:>10} {per_query:>14.2f} {batch:>10.2f} {per_query / batch:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Check the ticket service's HTTP API in-process against awkward input.
+
+Run from the repository root:
+
+    python -m benchmarks.check_service
+
+The ASGI app is called directly (no server or network) with the local
+embedding backend and a throwaway state directory. Tickets with a
+missing Ticket ID and with a mix of integer and string IDs must ingest,
+and IDs seen before must map back to their first index. A malformed
+row must fail only its own request, not others batched with it, and
+the state saved on shutdown must reload. Any failed check is reported
+and the exit status is 1.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+
+from core.embeddings import LocalBackend
+from core.incremental import IncrementalGrouper
+from core.service import TicketService, create_app
+
+
+MAX_DISTANCE = 0.35
+
+
+async def call(app, method: str, path: str, body=None) -> tuple[int, dict]:
+    """
+    (status, JSON body) of one request to app.
+    """
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": data, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": b""}
+    await app(scope, receive, send)
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+async def run_checks(state_dir: str) -> list[str]:
+    service = TicketService(
+        IncrementalGrouper(MAX_DISTANCE, state_dir), LocalBackend(n_jobs=1), save_interval=None
+    )
+    app = create_app(service)
+    failures = []
+
+    def check(name: str, ok: bool, detail=""):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(f"{name}: {detail}")
+
+    await service.start()
+
+    try:
+        status, body = await call(app, "POST", "/tickets", [
+            {"Ticket ID": None, "Description": "vpn login fails"},
+            {"Description": "vpn login fails after password reset"},
+            {"Ticket ID": "INC-1", "Description": "printer jammed on floor 2"},
+        ])
+        check("null and missing IDs ingest", status == 200, body)
+        if status == 200:
+            ids = [t["ticket_id"] for t in body["tickets"]]
+            check("missing IDs come back as null", ids == [None, None, "INC-1"], ids)
+
+        status, body = await call(app, "POST", "/tickets", [
+            {"Ticket ID": 1001, "Description": "outlook keeps asking for password"},
+            {"Ticket ID": "INC-2", "Description": "outlook password prompt loops"},
+            {"Ticket ID": None, "Description": "sso redirect loop"},
+        ])
+        check("mixed int and str IDs ingest", status == 200, body)
+        if status == 200:
+            ids = [t["ticket_id"] for t in body["tickets"]]
+            check("int IDs stay ints", ids == [1001, "INC-2", None], ids)
+
+        status, body = await call(app, "POST", "/tickets", [
+            {"Ticket ID": 1001, "Description": "outlook keeps asking for password"},
+            {"Ticket ID": "INC-1", "Description": "printer jammed on floor 2"},
+        ])
+        indices = [t["index"] for t in body.get("tickets", [])]
+        check("known IDs are not added again", status == 200 and indices == [3, 2], body)
+
+        # Sent together, so both land in one ingest batch
+        (bad_status, bad), (good_status, good) = await asyncio.gather(
+            call(app, "POST", "/tickets", [
+                {"Ticket ID": ["INC-3"], "Description": "disk full on build agent"},
+            ]),
+            call(app, "POST", "/tickets", [
+                {"Ticket ID": "INC-4", "Description": "disk full on build server"},
+            ]),
+        )
+        check("malformed row is refused", bad_status == 400, bad)
+        check("batched request still ingests", good_status == 200, good)
+
+        status, body = await call(app, "GET", "/health")
+        check("ticket count", status == 200 and body["tickets"] == 7, body)
+    finally:
+        await service.stop()
+
+    saved = IncrementalGrouper.load(state_dir, MAX_DISTANCE)
+    check(
+        "saved state reloads",
+        len(saved) == 7 and saved.groups() == service.grouper.groups(),
+        f"{len(saved)} tickets"
+    )
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        failures = asyncio.run(run_checks(state_dir))
+
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Seeded synthetic ticket corpora at any scale, built on the IAM dataset
+generator (generate_iam_dataset.py), plus deterministic fake embeddings.
+
+Themes and assets are drawn independently: n_themes controls how many
+distinct incident types there are, n_assets how many hosts, and
+asset_skew how concentrated tickets are on a few of them (0 = uniform,
+larger = Zipf-like hot spots). Everything is a function of seed.
+"""
+
+import numpy as np
+import pandas as pd
+
+from generate_iam_dataset import (
+    ASSETS,
+    ASSIGNEES,
+    IAM_THEMES,
+    PRIORITIES,
+    SEVERITIES,
+    START_DATE,
+    STATUSES,
+    USERS,
+)
+
+
+ASSET_KINDS = ["pingfed", "sail", "dirsync", "plainid", "mfa", "ldap", "auth"]
+
+
+def theme_texts(n_themes: int) -> list[str]:
+    """
+    The first themes are the IAM ones; beyond that they get error codes.
+    """
+    return [
+        IAM_THEMES[t] if t < len(IAM_THEMES)
+        else f"{IAM_THEMES[t % len(IAM_THEMES)]} (error E{t:05d})"
+        for t in range(n_themes)
+    ]
+
+
+def asset_table(n_assets: int) -> list[tuple[str, str, str]]:
+    """
+    (hostname, ip, assignment group) for n_assets hosts, starting with
+    the IAM dataset's own.
+    """
+    table = list(ASSETS[:n_assets])
+
+    for k in range(len(table), n_assets):
+        kind = ASSET_KINDS[k % len(ASSET_KINDS)]
+        table.append((
+            f"srv-{kind}-{k:05d}",
+            f"10.{32 + k // 65536}.{k // 256 % 256}.{k % 256}",
+            ASSETS[k % len(ASSETS)][2]
+        ))
+
+    return table
+
+
+def _skewed_choice(rng, n: int, size: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+
+def generate_corpus(
+    n: int,
+    seed: int = 42,
+    n_themes: int | None = None,
+    n_assets: int | None = None,
+    asset_skew: float = 1.0
+):
+    """
+    n tickets in the IAM workbook's column layout.
+
+    Returns (df, themes, assets): the DataFrame plus the theme and asset
+    index of every row, which fake_embeddings() uses.
+    """
+    rng = np.random.default_rng(seed)
+
+    n_themes = n_themes or max(len(IAM_THEMES), n // 100)
+    n_assets = n_assets or max(len(ASSETS), n // 50)
+
+    theme_names = np.array(theme_texts(n_themes), dtype=object)
+    hosts = asset_table(n_assets)
+    host_names = np.array([h[0] for h in hosts], dtype=object)
+    host_ips = np.array([h[1] for h in hosts], dtype=object)
+    host_groups = np.array([h[2] for h in hosts], dtype=object)
+
+    themes = rng.integers(0, n_themes, size=n)
+    assets = _skewed_choice(rng, n_assets, n, asset_skew)
+    users = np.array(USERS, dtype=object)[rng.integers(0, len(USERS), size=n)]
+
+    opened = START_DATE + pd.to_timedelta(rng.integers(0, 720, size=n), unit="h")
+    resolved = opened + pd.to_timedelta(rng.integers(1, 7, size=n), unit="h")
+    closed = resolved + pd.to_timedelta(rng.integers(10, 46, size=n), unit="min")
+
+    descriptions = [
+        f"Incident involving {theme} on {host}.\n"
+        f"Affected asset: {host}.\n"
+        f"Source IP: {ip}.\n"
+        f"User reported: {user}.\n"
+        f"URL https://{host}/auth returned errors intermittently."
+        for theme, host, ip, user in zip(
+            theme_names[themes], host_names[assets], host_ips[assets], users
+        )
+    ]
+
+    df = pd.DataFrame({
+        "Incident ID": [f"INC{100000 + i}" for i in range(1, n + 1)],
+        "Opened At": opened.strftime("%Y-%m-%d %H:%M:%S"),
+        "Short Description": theme_names[themes] + " on " + host_names[assets],
+        "Description": descriptions,
+        "Priority": rng.choice(PRIORITIES, size=n),
+        "Severity": rng.choice(SEVERITIES, size=n),
+        "Status": rng.choice(STATUSES, size=n),
+        "Resolved At": resolved.strftime("%Y-%m-%d %H:%M:%S"),
+        "Closed At": closed.strftime("%Y-%m-%d %H:%M:%S"),
+        "Assigned To": rng.choice(ASSIGNEES, size=n),
+        "Assignment Group": host_groups[assets],
+        "Resolution Notes": "Service restarted and logs reviewed.",
+        "Category": "IAM",
+        "Configuration Item": host_names[assets],
+        "Environment": "Production",
+    })
+
+    return df, themes, assets
+
+
+def fake_embeddings(
+    themes: np.ndarray,
+    assets: np.ndarray,
+    dim: int = 128,
+    seed: int = 42,
+    noise: float = 0.6,
+    asset_weight: float = 0.3
+) -> np.ndarray:
+    """
+    Deterministic float32 unit vectors: a per-theme centroid, a smaller
+    per-asset component and per-ticket noise, so tickets of one theme
+    cluster and shared hosts pull tickets slightly closer.
+    """
+    rng = np.random.default_rng(seed)
+
+    theme_centroids = rng.normal(size=(themes.max() + 1, dim)).astype(np.float32)
+    asset_centroids = rng.normal(size=(assets.max() + 1, dim)).astype(np.float32)
+
+    embeddings = theme_centroids[themes]
+    embeddings += asset_weight * asset_centroids[assets]
+    embeddings += rng.normal(scale=noise, size=embeddings.shape).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    return embeddings
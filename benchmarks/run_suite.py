@@ -0,0 +1,287 @@
+"""
+Reproducible end-to-end benchmark over synthetic corpora of several sizes.
+
+Run from the repository root:
+
+    python -m benchmarks.run_suite
+    python -m benchmarks.run_suite --sizes 1000 10000 100000 1000000
+    python -m benchmarks.run_suite --compare benchmarks/results/baseline.json
+
+For each size a seeded corpus is generated (benchmarks/corpus.py) with
+deterministic fake embeddings, so no network access is needed. The
+suite times the loader (.csv and, up to --xlsx-up-to rows, .xlsx), the
+local embedding backend, asset extraction, deduplication, grouping,
+retrieval and the offline-results writer and reader.
+
+Results are written as JSON; with --repeat, each stage reports its
+fastest run. With --compare, any stage more than --tolerance slower
+than in the baseline file is reported and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.corpus import fake_embeddings, generate_corpus
+from core.assets import AssetIndex, extract_assets_batch
+from core.dedup import deduplicate
+from core.embeddings import LocalBackend, embed_texts
+from core.grouping import group_by_similarity, split_oversized_groups
+from core.instrumentation import RunReport, activate
+from core.loader import load_excel_tickets, load_tickets
+from core.offline_store import OfflineStore
+from core.retriever import INDEX_TYPES, TicketRetriever
+from core.sharded import group_by_similarity_sharded
+from generate_offline_results import offline_group, write_offline_results
+
+
+MAX_DISTANCE = 0.35
+RESULTS_DIR = Path("benchmarks/results")
+RETRIEVAL_QUERIES = 10_000
+OFFLINE_PAGE_SIZE = 50
+MIN_COMPARED_SECONDS = 0.05  # stages faster than this are too noisy to compare
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    try:
+        import faiss
+        faiss_version = faiss.__version__
+    except (ImportError, AttributeError):
+        faiss_version = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "faiss": faiss_version,
+    }
+
+
+def run_size(n: int, args, workdir: Path) -> RunReport:
+    report = RunReport(f"suite-{n}")
+
+    with activate(report):
+        with report.stage("generate", items=n):
+            df, themes, assets = generate_corpus(
+                n,
+                seed=args.seed,
+                n_themes=args.themes,
+                n_assets=args.assets,
+                asset_skew=args.asset_skew
+            )
+            embeddings = fake_embeddings(themes, assets, dim=args.dim, seed=args.seed)
+
+        csv_path = workdir / f"corpus-{n}.csv"
+        df.to_csv(csv_path, index=False)
+
+        with report.stage("load_csv"):
+            tickets = load_tickets(csv_path)
+
+        if n <= args.xlsx_up_to:
+            xlsx_path = workdir / f"corpus-{n}.xlsx"
+            df.to_excel(xlsx_path, index=False)
+
+            with report.stage("load_xlsx"):
+                load_excel_tickets(xlsx_path)
+
+        del df
+
+        texts = [t["embedding_text"] for t in tickets]
+
+        with report.stage("embed_local"):
+            embed_texts(texts, backend=LocalBackend())
+
+        with report.stage("extract_assets", items=n):
+            extract_assets_batch(texts)
+
+        with report.stage("dedup") as stage:
+            stage["representatives"] = len(deduplicate(texts))
+
+        with report.stage("asset_index", items=n):
+            AssetIndex.from_tickets(tickets)
+
+        method = "exact" if n <= args.exact_up_to else "faiss"
+
+        with report.stage("group") as stage:
+            groups, _ = group_by_similarity(
+                embeddings,
+                tickets,
+                MAX_DISTANCE,
+                return_distances=False,
+                method=method,
+                index_type=args.index_type
+            )
+            stage["method"] = method
+            stage["groups"] = len(groups)
+
+        if args.workers is not None and method == "exact":
+            with report.stage("group_sharded") as stage:
+                sharded = group_by_similarity_sharded(
+                    embeddings, tickets, MAX_DISTANCE, workers=args.workers
+                )
+                stage["workers"] = args.workers
+                stage["matches"] = sharded == groups
+            del sharded
+
+        with report.stage("split_groups") as stage:
+            groups = split_oversized_groups(groups, embeddings)
+            stage["groups"] = len(groups)
+
+        queries = np.arange(min(n, RETRIEVAL_QUERIES))
+
+        with report.stage("retrieval_build", items=n):
+            retriever = TicketRetriever(
+                embeddings, tickets, metric="cosine", index_type=args.index_type
+            )
+
+        with report.stage("retrieval_query", items=len(queries)):
+            retriever.find_similar_batch(queries, 10, MAX_DISTANCE)
+
+        del retriever
+
+        meaningful_groups = [g for g in groups if len(g) > 1]
+        analysis = {"group_label": "benchmark", "summary": "", "common_patterns": [],
+                    "hypotheses": [], "recommended_checks": []}
+
+        with report.stage("offline_writer", items=len(meaningful_groups)):
+            offline_path = write_offline_results(
+                (
+                    offline_group(number, group, tickets, analysis)
+                    for number, group in enumerate(meaningful_groups, start=1)
+                ),
+                workdir / f"offline-{n}.sqlite"
+            )
+
+        # What the app does: count, one page of groups, one group's tickets
+        with report.stage("offline_reader"):
+            store = OfflineStore(offline_path)
+            store.count(min_size=2)
+            page = store.groups(min_size=2, limit=OFFLINE_PAGE_SIZE)
+            if page:
+                store.tickets(page[0]["group_number"])
+            store.close()
+
+    return report
+
+
+def fastest(reports: list[RunReport]) -> list[dict]:
+    """
+    The first report's stages, each with the best time across reports.
+    """
+    stages = [dict(stage) for stage in reports[0].stages]
+
+    for stage in stages:
+        stage["seconds"] = min(
+            s["seconds"] for report in reports for s in report.stages
+            if s["stage"] == stage["stage"]
+        )
+
+    return stages
+
+
+def compare(results: dict, baseline_path: Path, tolerance: float) -> list[str]:
+    """
+    Stages more than tolerance (a fraction) slower than in the baseline.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    expected = {
+        (run["size"], stage["stage"]): stage["seconds"]
+        for run in baseline["runs"]
+        for stage in run["stages"]
+    }
+
+    regressions = []
+
+    for run in results["runs"]:
+        for stage in run["stages"]:
+            before = expected.get((run["size"], stage["stage"]))
+            if before is None or max(before, stage["seconds"]) < MIN_COMPARED_SECONDS:
+                continue
+
+            if stage["seconds"] > before * (1 + tolerance):
+                regressions.append(
+                    f"{run['size']:>9} {stage['stage']:<16} "
+                    f"{before:.3f}s -> {stage['seconds']:.3f}s"
+                )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--themes", type=int, help="distinct themes (default: size / 100)")
+    parser.add_argument("--assets", type=int, help="distinct hosts (default: size / 50)")
+    parser.add_argument("--asset-skew", type=float, default=1.0)
+    parser.add_argument("--xlsx-up-to", type=int, default=10_000)
+    parser.add_argument("--exact-up-to", type=int, default=100_000,
+                        help="larger corpora are grouped with method='faiss'")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="hnsw")
+    parser.add_argument("--workers", type=int,
+                        help="also time multi-process grouping (0 = one per core)")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="baseline results file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc)
+    results = {
+        "started": started.isoformat(),
+        "environment": environment(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "runs": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            print(f"\n=== {n} tickets ===\n")
+            reports = [run_size(n, args, Path(tmp)) for _ in range(args.repeat)]
+            print(reports[0].summary())
+            results["runs"].append({"size": n, "stages": fastest(reports)})
+
+    output = args.output or RESULTS_DIR / f"suite-{started.strftime('%Y%m%dT%H%M%SZ')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+
+    print(f"\nResults written to {output}")
+
+    if args.compare is not None:
+        regressions = compare(results, args.compare, args.tolerance)
+
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than {args.compare} by > {args.tolerance:.0%}:")
+            print("\n".join(regressions))
+            sys.exit(1)
+
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
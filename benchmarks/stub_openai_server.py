@@ -0,0 +1,176 @@
+"""
+Local stand-in for the OpenAI embeddings and chat completions endpoints.
+
+Vectors are derived from a hash of each input, so they are stable across
+runs, and chat completions return a fixed group analysis. Latency and
+429/500 errors can be injected to exercise batching, retries and
+backpressure:
+
+    python -m benchmarks.stub_openai_server --port 8765 --latency 0.2 --error-rate 0.1
+
+Point the pipeline at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python main.py
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+DIMENSIONS = 1536
+
+
+def fake_embedding(text: str, dimensions: int = DIMENSIONS) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).normal(size=dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0
+    requests_served = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_failure(self) -> bool:
+        if random.random() >= self.error_rate:
+            return False
+
+        if random.random() < 0.5:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                {"retry-after": "0.1"}
+            )
+        else:
+            self._send_json(500, {"error": {"message": "Injected server error"}})
+        return True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        time.sleep(self.latency)
+
+        with StubHandler._lock:
+            StubHandler.requests_served += 1
+
+        if self._inject_failure():
+            return
+
+        if self.path.rstrip("/").endswith("/embeddings"):
+            self._embeddings(request)
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat_completion(request)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _embeddings(self, request: dict):
+        inputs = request.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(text, request.get("dimensions") or DIMENSIONS)
+
+            if request.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        tokens = sum(len(text.split()) for text in inputs)
+
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": request.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def _chat_completion(self, request: dict):
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        incidents = [line[2:] for line in prompt.splitlines() if line.startswith("- ")]
+
+        analysis = {
+            "group_label": f"Stub analysis of {len(incidents)} incidents",
+            "summary": incidents[0][:200] if incidents else "",
+            "common_patterns": [],
+            "hypotheses": [],
+            "recommended_checks": [],
+        }
+        content = "```json\n" + json.dumps(analysis, indent=2) + "\n```"
+        tokens = len(prompt.split())
+
+        self._send_json(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": tokens,
+                "completion_tokens": 50,
+                "total_tokens": tokens + 50,
+            },
+        })
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, latency: float = 0.0, error_rate: float = 0.0):
+    """
+    Start the stub server on a background thread and return it.
+    """
+    StubHandler.latency = latency
+    StubHandler.error_rate = error_rate
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429/500 responses")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency, args.error_rate)
+    print(f"Stub OpenAI server on http://{args.host}:{args.port}/v1")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,20 @@
 import os
+import hashlib
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
 
+from core.analysis_cache import AnalysisCache
+from core.instrumentation import bind, record
+from core.retry import Backpressure, call_with_retries, MAX_RETRIES
+
+
+ANALYSIS_MODEL = "gpt-4.1-mini"
+TEMPERATURE = 0.2
+MAX_CONCURRENCY = 8
+REQUEST_TIMEOUT = 60.0  # seconds per LLM call
+
 
 SYSTEM_PROMPT = """
 You are an internal IT service operations analyst.
@@ -32,10 +44,22 @@ def _clean_json_response(content: str) -> str:
     return content.strip()
 
 
-def analyse_group(descriptions: list[str]) -> dict:
+def analysis_fingerprint(descriptions: list[str]) -> str:
     """
-    Analyse grouped ticket descriptions using LLM.
-    OpenAI client created only when this function runs.
+    Stable cache key for a group: prompt, model, temperature and the
+    sorted descriptions. Ticket order within a group does not matter.
+    """
+    payload = json.dumps(
+        [SYSTEM_PROMPT, ANALYSIS_MODEL, TEMPERATURE, sorted(descriptions)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def create_client() -> OpenAI:
+    """
+    OpenAI client created only when analysis runs.
+    Retries are handled by call_with_retries, not the SDK.
     """
 
     api_key = os.getenv("OPENAI_API_KEY")
@@ -43,8 +67,10 @@ def analyse_group(descriptions: list[str]) -> dict:
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not set. Cannot perform LLM analysis.")
 
-    client = OpenAI(api_key=api_key)
+    return OpenAI(api_key=api_key, max_retries=0)
 
+
+def _build_user_prompt(descriptions: list[str]) -> str:
     user_prompt = """
 Below is a group of incident descriptions that are semantically similar.
 
@@ -64,22 +90,129 @@ Incident descriptions:
     for d in descriptions:
         user_prompt += f"- {d}\n"
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=0.2
+    return user_prompt
+
+
+def analyse_group(
+    descriptions: list[str],
+    client: OpenAI | None = None,
+    timeout: float = REQUEST_TIMEOUT,
+    retries: int = MAX_RETRIES,
+    backpressure: Backpressure | None = None,
+    cache: AnalysisCache | None = None,
+    refresh: bool = False
+) -> dict:
+    """
+    Analyse grouped ticket descriptions using LLM.
+    Pass a client to reuse its connection pool across calls.
+    With a cache, a previous analysis of the same descriptions is
+    returned unless refresh is set.
+    """
+
+    key = analysis_fingerprint(descriptions) if cache is not None else None
+
+    if cache is not None and not refresh:
+        cached = cache.get(key)
+        if cached is not None:
+            record(items=1, cache_hits=1)
+            return cached
+
+    if client is None:
+        client = create_client()
+
+    user_prompt = _build_user_prompt(descriptions)
+
+    response = call_with_retries(
+        lambda: client.with_options(timeout=timeout).chat.completions.create(
+            model=ANALYSIS_MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=TEMPERATURE
+        ),
+        retries=retries,
+        backpressure=backpressure
     )
 
+    record(items=1, cache_misses=1, tokens=getattr(response.usage, "total_tokens", 0))
+
     content = response.choices[0].message.content
     cleaned = _clean_json_response(content)
 
     try:
-        return json.loads(cleaned)
+        analysis = json.loads(cleaned)
     except json.JSONDecodeError:
         return {
             "error": "Failed to parse LLM response",
             "raw_response": content
         }
+
+    # Parse failures are not cached so the next run tries again
+    if cache is not None:
+        cache.put(key, analysis)
+
+    return analysis
+
+
+def analyse_groups(
+    groups: list[list[str]],
+    max_concurrency: int = MAX_CONCURRENCY,
+    timeout: float = REQUEST_TIMEOUT,
+    retries: int = MAX_RETRIES,
+    cache: AnalysisCache | None = None,
+    refresh: bool = False
+):
+    """
+    Analyse many groups concurrently through one shared client.
+
+    Yields (index, analysis, error) as each group finishes, in completion
+    order. index is the group's position in groups; error is the
+    exception that ended its analysis, in which case analysis is None.
+    Cached analyses are yielded first, before any request is made.
+    """
+
+    pending = []
+
+    for index, descriptions in enumerate(groups):
+        cached = None
+        if cache is not None and not refresh:
+            cached = cache.get(analysis_fingerprint(descriptions))
+
+        if cached is not None:
+            record(items=1, cache_hits=1)
+            yield index, cached, None
+        else:
+            pending.append(index)
+
+    if not pending:
+        return
+
+    client = create_client()
+    backpressure = Backpressure()
+    pool = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    try:
+        # The cache was already consulted above, so only store new results
+        futures = {
+            pool.submit(
+                bind(analyse_group),
+                groups[index],
+                client=client,
+                timeout=timeout,
+                retries=retries,
+                backpressure=backpressure,
+                cache=cache,
+                refresh=True
+            ): index
+            for index in pending
+        }
+
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    finally:
+        # Stop queued work if the caller abandons the generator early
+        pool.shutdown(wait=False, cancel_futures=True)
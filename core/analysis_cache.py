@@ -0,0 +1,115 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+DEFAULT_CACHE_PATH = Path("data/cache/analysis.sqlite")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class AnalysisCache:
+    """
+    Persistent SQLite store of parsed LLM group analyses.
+
+    Entries expire ttl_seconds after they were written, and the least
+    recently used ones are dropped once there are more than max_entries.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Return the cached analysis for key, or None if missing or expired.
+        """
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analysis FROM analyses WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE analyses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+
+        return json.loads(row[0])
+
+    def put(self, key: str, analysis: dict):
+        """
+        Store an analysis, then drop expired and over-budget entries.
+        """
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, analysis, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(analysis), now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM analyses WHERE created_at < ?",
+                (now - self.ttl_seconds,)
+            )
+            self._conn.execute(
+                "DELETE FROM analyses WHERE key IN "
+                "(SELECT key FROM analyses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,216 @@
+import re
+from typing import Iterable
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+# IP address pattern
+IP_PATTERN = re.compile(r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b")
+
+# E-mail pattern
+EMAIL_PATTERN = re.compile(r"\b[\w\.-]+@[\w\.-]+\.\w+\b")
+
+# URL pattern
+URL_PATTERN = re.compile(r"https?://[^\s]+")
+
+# Hostname / server-like pattern (server01, auth-prod-01, etc.)
+HOSTNAME_PATTERN = re.compile(r"\b[a-zA-Z0-9\-]{3,}\.(?:com|net|org|local|corp|internal)\b")
+SERVER_PATTERN = re.compile(r"\b(?:srv|server|auth|ping|iam|dc|mfa)[a-zA-Z0-9\-]*\b")
+
+# Cheap substring hints that every match of a pattern must contain, so
+# most texts skip most regex scans
+_IP_HINT = re.compile(r"[0-9]\.[0-9]")
+_TLD_HINTS = (".com", ".net", ".org", ".local", ".corp", ".internal")
+_SERVER_HINTS = ("srv", "server", "auth", "ping", "iam", "dc", "mfa")
+
+
+# Responsible AI sanitiser, applied in this order
+_SENSITIVE_PATTERNS = [
+    # Emails
+    (EMAIL_PATTERN, "[REDACTED_EMAIL]"),
+
+    # IP Addresses
+    (re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b"), "[REDACTED_IP]"),
+
+    # Server / Hostnames (basic pattern)
+    (re.compile(r"\b(?:srv|server|host)[\w\-\.]*\b", re.IGNORECASE), "[REDACTED_HOST]"),
+
+    # Password-like fields
+    (re.compile(r"password\s*[:=]\s*\S+", re.IGNORECASE), "password=[REDACTED]"),
+]
+
+
+def extract_assets(text: str) -> list[str]:
+    """
+    Extract IPs, hostnames, URLs and server-like tokens.
+
+    Patterns are compiled once and each only runs when its hint appears
+    in the text. They still scan separately, since a URL can contain a
+    hostname and a server token that also count as assets.
+    """
+    if not text:
+        return []
+
+    matches = []
+
+    if _IP_HINT.search(text):
+        matches += IP_PATTERN.findall(text)
+    if "://" in text:
+        matches += URL_PATTERN.findall(text)
+    if any(hint in text for hint in _TLD_HINTS):
+        matches += HOSTNAME_PATTERN.findall(text)
+    if any(hint in text for hint in _SERVER_HINTS):
+        matches += SERVER_PATTERN.findall(text)
+
+    return sorted({m.lower() for m in matches})
+
+
+def extract_assets_batch(texts: Iterable[str]) -> list[list[str]]:
+    """
+    extract_assets over a whole column (list or pandas Series).
+    Repeated texts, common in template-heavy exports, are scanned once.
+    """
+    seen = {}
+    results = []
+
+    for text in texts:
+        assets = seen.get(text)
+        if assets is None:
+            assets = seen[text] = extract_assets(text)
+        results.append(assets)
+
+    return results
+
+
+def sanitize_text(text: str) -> str:
+    """
+    Removes sensitive information before sending to LLM.
+    """
+    for pattern, replacement in _SENSITIVE_PATTERNS:
+        text = pattern.sub(replacement, text)
+
+    return text
+
+
+class AssetVocabulary:
+    """
+    Interns asset strings as dense integer IDs.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.assets = []
+
+    def __len__(self):
+        return len(self.assets)
+
+    def intern(self, asset: str) -> int:
+        asset_id = self.ids.get(asset)
+        if asset_id is None:
+            asset_id = self.ids[asset] = len(self.assets)
+            self.assets.append(asset)
+        return asset_id
+
+    def encode(self, asset_lists: Iterable[Iterable[str]]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        CSR-style (offsets, asset_ids): ticket i mentions
+        asset_ids[offsets[i]:offsets[i + 1]], each ID once.
+        """
+        offsets = [0]
+        asset_ids = []
+
+        for assets in asset_lists:
+            asset_ids.extend(sorted({self.intern(a) for a in assets or []}))
+            offsets.append(len(asset_ids))
+
+        return np.array(offsets, dtype=np.int64), np.array(asset_ids, dtype=np.int64)
+
+    def incidence(self, asset_lists: Iterable[Iterable[str]]) -> csr_matrix:
+        """
+        Sparse ticket x asset matrix with a 1 wherever a ticket mentions an asset.
+        """
+        return self.incidence_from_ids(*self.encode(asset_lists))
+
+    def incidence_from_ids(self, offsets: np.ndarray, asset_ids: np.ndarray) -> csr_matrix:
+        """
+        incidence() for lists already encoded with this vocabulary.
+        """
+        return csr_matrix(
+            (np.ones(len(asset_ids), dtype=np.int32), asset_ids, offsets),
+            shape=(len(offsets) - 1, len(self))
+        )
+
+
+class AssetIndex:
+    """
+    Ticket x asset incidence matrix plus its transpose, the inverted
+    asset -> tickets index, built once for a set of tickets.
+
+    tickets_for("10.24.66.14") is a dict lookup and an array slice, so
+    triage queries stay well under a millisecond on large corpora.
+    """
+
+    def __init__(self, asset_lists: Iterable[Iterable[str]]):
+        self.vocabulary = AssetVocabulary()
+        self.incidence = self.vocabulary.incidence(asset_lists)
+        self.inverted = self.incidence.T.tocsr()
+
+    @classmethod
+    def from_tickets(cls, tickets) -> "AssetIndex":
+        """
+        Index a list of ticket dicts, or a TicketTable without decoding
+        its already-interned asset IDs.
+        """
+        vocabulary = getattr(tickets, "vocabulary", None)
+        if not isinstance(vocabulary, AssetVocabulary):
+            return cls(t.get("assets") for t in tickets)
+
+        index = cls.__new__(cls)
+        index.vocabulary = vocabulary
+        index.incidence = vocabulary.incidence_from_ids(tickets.asset_offsets, tickets.asset_ids)
+        index.inverted = index.incidence.T.tocsr()
+        return index
+
+    def __len__(self):
+        return self.incidence.shape[0]
+
+    def tickets_for(self, asset: str) -> np.ndarray:
+        """
+        Sorted indices of the tickets that mention asset.
+        """
+        asset_id = self.vocabulary.ids.get(asset.strip().lower())
+        if asset_id is None:
+            return np.zeros(0, dtype=self.inverted.indices.dtype)
+
+        start, stop = self.inverted.indptr[asset_id:asset_id + 2]
+        return self.inverted.indices[start:stop]
+
+    def assets_of(self, ticket: int) -> list[str]:
+        start, stop = self.incidence.indptr[ticket:ticket + 2]
+        return [self.vocabulary.assets[a] for a in self.incidence.indices[start:stop]]
+
+    def shared_counts(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """
+        Number of assets shared by each (rows[k], cols[k]) ticket pair.
+        """
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        shared = self.incidence[rows].multiply(self.incidence[cols]).sum(axis=1)
+        return np.asarray(shared).ravel().astype(np.int64)
+
+    def sharing_pairs(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (rows, cols, counts) for every ticket pair i < j sharing at least
+        one asset. An asset mentioned by k tickets contributes k^2 / 2
+        pairs, so very common assets make this large.
+        """
+        shared = (self.incidence @ self.incidence.T).tocoo()
+        upper = shared.row < shared.col
+
+        return (
+            shared.row[upper].astype(np.int64),
+            shared.col[upper].astype(np.int64),
+            shared.data[upper].astype(np.int64),
+        )
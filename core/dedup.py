@@ -0,0 +1,243 @@
+import re
+import zlib
+from typing import Iterable, Sequence
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from core.assets import EMAIL_PATTERN, IP_PATTERN
+from core.instrumentation import record
+from core.tickets import TicketTable
+
+
+# Volatile tokens that vary between otherwise identical tickets, replaced
+# in this order before comparing descriptions. Like extract_assets, each
+# pattern only runs when its cheap hint is found in the text.
+_VOLATILE_PATTERNS = [
+    (EMAIL_PATTERN, "<email>", re.compile(r"@")),
+    (IP_PATTERN, "<ip>", re.compile(r"[0-9]\.[0-9]")),
+    (
+        re.compile(r"\b\d{4}-\d{2}-\d{2}(?:[ t]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?\b"),
+        "<time>",
+        re.compile(r"[0-9]-[0-9]")
+    ),
+    (re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b"), "<time>", re.compile(r"[0-9]:[0-9]")),
+    (
+        re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"),
+        "<uuid>",
+        re.compile(r"[0-9a-f]{4}-[0-9a-f]{4}-")
+    ),
+]
+
+SHINGLE_WORDS = 3
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16  # LSH bands of MINHASH_PERMUTATIONS / MINHASH_BANDS rows
+NEAR_DUPLICATE_THRESHOLD = 0.9  # estimated Jaccard similarity of shingles
+MINHASH_SEED = 42
+
+
+def normalize_volatile(text: str) -> str:
+    """
+    Description with e-mails, IPs, timestamps and UUIDs replaced by
+    placeholders and whitespace collapsed, so tickets raised from one
+    template compare equal.
+    """
+    text = (text or "").lower()
+
+    for pattern, replacement, hint in _VOLATILE_PATTERNS:
+        if hint.search(text):
+            text = pattern.sub(replacement, text)
+
+    return " ".join(text.split())
+
+
+def minhash_signatures(
+    texts: Sequence[str],
+    permutations: int = MINHASH_PERMUTATIONS,
+    seed: int = MINHASH_SEED
+) -> np.ndarray:
+    """
+    (len(texts), permutations) MinHash signatures of each text's word
+    shingles.
+
+    Shingles are hashed with CRC32, so signatures are stable across
+    processes, then permuted with multiply-shift hashing
+    ((a * h + b) mod 2**64) >> 32, all texts at once.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, size=permutations, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=permutations, dtype=np.uint64)
+
+    # Flat shingle hashes of every text, with each text's start offset
+    hashes = []
+    starts = np.empty(len(texts), dtype=np.int64)
+
+    for row, text in enumerate(texts):
+        words = text.split()
+        starts[row] = len(hashes)
+        hashes.extend({
+            zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+            for i in range(max(1, len(words) - SHINGLE_WORDS + 1))
+        })
+
+    hashes = np.array(hashes, dtype=np.uint64)
+    signatures = np.empty((len(texts), permutations), dtype=np.uint32)
+
+    for k in range(permutations):
+        permuted = ((a[k] * hashes + b[k]) >> np.uint64(32)).astype(np.uint32)
+        signatures[:, k] = np.minimum.reduceat(permuted, starts)
+
+    return signatures
+
+
+def near_duplicate_pairs(
+    signatures: np.ndarray,
+    threshold: float = NEAR_DUPLICATE_THRESHOLD,
+    bands: int = MINHASH_BANDS
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (rows, cols) of signatures whose estimated Jaccard similarity is at
+    least threshold.
+
+    Banded LSH: within each band, every signature is compared with the
+    first one sharing its band values, so the work is linear in the
+    number of signatures rather than quadratic.
+    """
+    n, permutations = signatures.shape
+    width = permutations // bands
+    everyone = np.arange(n)
+    # Folds a band's values into one 64-bit key (a rare collision only
+    # costs a wasted comparison)
+    multipliers = np.random.default_rng(MINHASH_SEED).integers(
+        1, 1 << 63, size=width, dtype=np.uint64
+    ) | np.uint64(1)
+
+    rows = []
+    cols = []
+
+    for band in range(bands):
+        keys = signatures[:, band * width:(band + 1) * width].astype(np.uint64) @ multipliers
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        heads = first[inverse]
+
+        candidates = everyone[heads != everyone]
+        agreement = (signatures[candidates] == signatures[heads[candidates]]).mean(axis=1)
+        similar = agreement >= threshold
+
+        rows.append(heads[candidates[similar]])
+        cols.append(candidates[similar])
+
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+class Deduplication:
+    """
+    Tickets collapsed onto representatives.
+
+    labels[i] is the representative (0 .. len - 1) standing in for
+    ticket i, representatives[r] the ticket index of representative r
+    (the lowest in its cluster) and weights[r] how many tickets it
+    stands for.
+    """
+
+    def __init__(self, labels: np.ndarray):
+        self.labels = labels
+
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        self._members = np.split(order, boundaries) if len(labels) else []
+
+        self.representatives = np.array(
+            [members[0] for members in self._members], dtype=np.int64
+        )
+        self.weights = np.array([len(members) for members in self._members], dtype=np.int64)
+
+    @classmethod
+    def identity(cls, n: int) -> "Deduplication":
+        """
+        Every ticket its own representative, i.e. deduplication off.
+        """
+        return cls(np.arange(n, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.representatives)
+
+    def members(self, representative: int) -> list[int]:
+        return self._members[representative].tolist()
+
+    def representative_tickets(self, tickets: TicketTable) -> TicketTable:
+        """
+        The representatives' rows of tickets, each carrying the union of
+        its members' asset IDs so asset-aware grouping still sees all of
+        them. If nothing was collapsed, tickets is returned as it is.
+        """
+        if len(self) == len(tickets):
+            return tickets
+
+        representatives = tickets.take(self.representatives)
+
+        # Every member's asset IDs keyed by its representative, de-duplicated
+        owners = np.repeat(self.labels, np.diff(tickets.asset_offsets))
+        width = max(len(tickets.vocabulary), 1)
+        owners, asset_ids = np.divmod(np.unique(owners * width + tickets.asset_ids), width)
+
+        representatives.asset_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(owners, minlength=len(self)))]
+        ).astype(np.int64)
+        representatives.asset_ids = asset_ids.astype(np.int64)
+        return representatives
+
+    def expand(self, groups: Iterable[Iterable[int]]) -> list[list[int]]:
+        """
+        Groups of representatives as groups of the original tickets,
+        each sorted, ordered by their lowest ticket index.
+        """
+        expanded = [
+            sorted(i for r in group for i in self._members[r].tolist())
+            for group in groups
+        ]
+        expanded.sort(key=lambda members: members[0] if members else -1)
+        return expanded
+
+
+def deduplicate(
+    texts: Sequence[str],
+    near_duplicates: bool = True,
+    threshold: float = NEAR_DUPLICATE_THRESHOLD
+) -> Deduplication:
+    """
+    Collapse tickets whose descriptions match after normalize_volatile(),
+    and, with near_duplicates, those whose normalized descriptions are
+    MinHash near-duplicates.
+    """
+    n = len(texts)
+    record(items=n)
+
+    # Exact matches after normalisation; repeated raw texts are
+    # normalised once
+    unique = {}
+    seen = {}
+    text_ids = np.empty(n, dtype=np.int64)
+
+    for i, text in enumerate(texts):
+        text_id = seen.get(text)
+        if text_id is None:
+            text_id = seen[text] = unique.setdefault(normalize_volatile(text), len(unique))
+        text_ids[i] = text_id
+
+    if near_duplicates and len(unique) > 1:
+        rows, cols = near_duplicate_pairs(minhash_signatures(list(unique)), threshold)
+        graph = coo_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, cols)),
+            shape=(len(unique), len(unique))
+        )
+        _, components = connected_components(graph, directed=False)
+        text_ids = components[text_ids]
+
+    # Number representatives by the first ticket of each cluster
+    _, first, inverse = np.unique(text_ids, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind="stable")] = np.arange(len(first))
+
+    return Deduplication(rank[inverse.ravel()])
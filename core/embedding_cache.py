@@ -0,0 +1,197 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+
+DEFAULT_CACHE_PATH = Path("data/cache/embeddings.sqlite")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # ~85k vectors of 1536 float32
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for cache keys: NFC, collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    """
+    Content address of an embedding: hash of (model name, normalized text).
+    """
+    payload = f"{model}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent SQLite store of float32 embedding vectors.
+
+    Entries are evicted least-recently-used first once the stored vectors
+    exceed max_bytes. The size of the store is summed once on open and
+    then tracked per write; other processes sharing the file can make it
+    drift, so it is summed again before anything is evicted. Hit/miss
+    counters cover the lifetime of the object.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        self._bytes = self._stored_bytes()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for texts; None marks a miss.
+        """
+        keys = [cache_key(model, t) for t in texts]
+        found = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+        results = [found.get(key) for key in keys]
+        hits = sum(r is not None for r in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """
+        Store embeddings for texts, then evict if over budget.
+        """
+        now = time.time()
+        rows = [
+            (cache_key(model, t), model, np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+
+        # The last row wins when a key repeats within one call
+        latest = {key: len(blob) for key, _, blob, _ in rows}
+
+        with self._lock:
+            replaced = self._vector_bytes(list(latest))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self._bytes += sum(latest.values()) - replaced
+
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def _vector_bytes(self, keys: List[str]) -> int:
+        """
+        Size of the stored vectors for keys that are already cached.
+        """
+        total = 0
+
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            total += self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings "
+                f"WHERE key IN ({placeholders})",
+                chunk
+            ).fetchone()[0]
+
+        return total
+
+    def _evict(self):
+        # Other processes may have written or evicted since the last sum
+        self._bytes = self._stored_bytes()
+        excess = self._bytes - self.max_bytes
+
+        if excess <= 0:
+            return
+
+        # Drop the oldest entries until we are back under budget
+        evicted, freed = [], 0
+        for key, size in self._conn.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"
+        ):
+            evicted.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self._conn.commit()
+        self._bytes -= freed
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters plus the current size of the store.
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,12 +1,67 @@
+import functools
 import os
-from typing import List
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
 from openai import OpenAI
+from sklearn.preprocessing import normalize
+
+from core.embedding_cache import EmbeddingCache
+from core.instrumentation import bind, record
+from core.retry import Backpressure, call_with_retries
+
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+MAX_BATCH_INPUTS = 1024  # API hard limit is 2048 inputs per request
+MAX_BATCH_TOKENS = 100_000  # API hard limit is 300k tokens per request
+MAX_CONCURRENCY = 4
+
+# "openai" or "local"; the local backend needs no API key or network
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+EMBEDDING_BACKENDS = ("openai", "local")
+
+LOCAL_DIMENSIONS = 256
+LOCAL_HASH_FEATURES = 2 ** 18
+LOCAL_BATCH_SIZE = 2048  # texts per parallel task
+LOCAL_PARALLEL_MIN = 50_000  # below this, worker start-up costs more than it saves
+LOCAL_SEED = 42
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap, conservative token estimate (~3 bytes per token).
+    """
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def _batches(texts: List[str], max_inputs: int, max_tokens: int):
+    """
+    Split texts into contiguous (start, stop) ranges within both budgets.
+    """
+    start = 0
+    tokens = 0
+
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+
+        if i > start and (i - start >= max_inputs or tokens + cost > max_tokens):
+            yield start, i
+            start = i
+            tokens = 0
+
+        tokens += cost
+
+    if start < len(texts):
+        yield start, len(texts)
 
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
+def _create_client() -> OpenAI:
     """
-    Generate embeddings for a list of texts.
-    OpenAI client is created only when this function is called.
+    OpenAI client is created only when embeddings are requested.
+    Retries are handled by call_with_retries, not the SDK.
     """
 
     api_key = os.getenv("OPENAI_API_KEY")
@@ -14,11 +69,194 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not set. Embeddings cannot be generated.")
 
-    client = OpenAI(api_key=api_key)
+    return OpenAI(api_key=api_key, max_retries=0)
 
+
+def _request_embeddings(client: OpenAI, texts: List[str]) -> List[List[float]]:
     response = client.embeddings.create(
-        model="text-embedding-3-small",
+        model=EMBEDDING_MODEL,
         input=texts
     )
 
-    return [item.embedding for item in response.data]
+    record(tokens=getattr(response.usage, "total_tokens", 0))
+
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def _embed_batched(
+    texts: List[str],
+    max_concurrency: int = MAX_CONCURRENCY,
+    max_inputs: int = MAX_BATCH_INPUTS,
+    max_tokens: int = MAX_BATCH_TOKENS
+) -> List[List[float]]:
+    """
+    Embed texts in token-budgeted batches sent concurrently through one
+    client. Results come back in input order.
+    """
+    if not texts:
+        return []
+
+    client = _create_client()
+    backpressure = Backpressure()
+    batches = list(_batches(texts, max_inputs, max_tokens))
+
+    def run(batch):
+        start, stop = batch
+        return call_with_retries(
+            lambda: _request_embeddings(client, texts[start:stop]),
+            backpressure=backpressure
+        )
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        results = pool.map(bind(run), batches)
+
+        return [embedding for batch in results for embedding in batch]
+
+
+class EmbeddingBackend(ABC):
+    """
+    Turns texts into vectors. model names the vector space, so cached
+    vectors and saved indexes from different backends never mix.
+    """
+
+    model: str
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+
+class OpenAIBackend(EmbeddingBackend):
+    """
+    EMBEDDING_MODEL through the OpenAI API, in concurrent batches.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        self.model = EMBEDDING_MODEL
+        self.max_concurrency = max_concurrency
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return _embed_batched(texts, self.max_concurrency)
+
+
+class LocalBackend(EmbeddingBackend):
+    """
+    CPU-only embeddings: hashed character n-grams projected down to
+    dimensions with a fixed sparse random projection.
+
+    Nothing is fitted to the corpus, so a text always gets the same
+    vector and results can be cached like API embeddings. Large inputs
+    are embedded in batches across n_jobs processes (all cores by default).
+    """
+
+    def __init__(
+        self,
+        dimensions: int = LOCAL_DIMENSIONS,
+        n_jobs: int | None = None,
+        batch_size: int = LOCAL_BATCH_SIZE
+    ):
+        from scipy.sparse import csr_matrix
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.random_projection import SparseRandomProjection
+
+        self.model = f"local-char-ngram-{dimensions}"
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+        self.vectorizer = HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=(3, 5),
+            n_features=LOCAL_HASH_FEATURES,
+            alternate_sign=False
+        )
+        # The projection only depends on the shapes and the seed
+        self.projection = SparseRandomProjection(
+            n_components=dimensions,
+            dense_output=True,
+            random_state=LOCAL_SEED
+        ).fit(csr_matrix((1, LOCAL_HASH_FEATURES)))
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = self.projection.transform(self.vectorizer.transform(texts))
+        return normalize(np.asarray(vectors, dtype=np.float32))
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        batches = [
+            texts[start:start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+
+        if self.n_jobs > 1 and len(texts) >= LOCAL_PARALLEL_MIN:
+            from joblib import Parallel, delayed
+
+            parts = Parallel(n_jobs=min(self.n_jobs, len(batches)))(
+                delayed(self._embed_batch)(batch) for batch in batches
+            )
+        else:
+            parts = [self._embed_batch(batch) for batch in batches]
+
+        return np.vstack(parts).tolist()
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend(
+    name: str | None = None,
+    max_concurrency: int = MAX_CONCURRENCY
+) -> EmbeddingBackend:
+    """
+    Backend by name, defaulting to the EMBEDDING_BACKEND environment variable.
+    Backends are built once per process and reused.
+    """
+    name = name or EMBEDDING_BACKEND
+
+    if name == "openai":
+        return OpenAIBackend(max_concurrency)
+    if name == "local":
+        return LocalBackend()
+
+    raise ValueError(f"Unknown embedding backend {name!r}, expected one of {EMBEDDING_BACKENDS}")
+
+
+def embed_texts(
+    texts: List[str],
+    cache: Optional[EmbeddingCache] = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    backend: EmbeddingBackend | None = None
+) -> List[List[float]]:
+    """
+    Generate embeddings for a list of texts with backend (by default the
+    one named by EMBEDDING_BACKEND). When a cache is given, only texts it
+    has not seen are embedded.
+    """
+
+    record(items=len(texts))
+
+    if backend is None:
+        backend = get_backend(max_concurrency=max_concurrency)
+
+    if cache is None:
+        return backend.embed(texts)
+
+    embeddings = cache.get_many(backend.model, texts)
+
+    hits = sum(e is not None for e in embeddings)
+    record(cache_hits=hits, cache_misses=len(texts) - hits)
+
+    # Each distinct missing text is sent once
+    missing = list(dict.fromkeys(
+        t for t, e in zip(texts, embeddings) if e is None
+    ))
+
+    if missing:
+        fresh = dict(zip(missing, backend.embed(missing)))
+        cache.put_many(backend.model, missing, [fresh[t] for t in missing])
+
+        embeddings = [
+            e if e is not None else fresh[t]
+            for t, e in zip(texts, embeddings)
+        ]
+
+    return embeddings
@@ -1,8 +1,22 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_distances
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import normalize
+
+from core.assets import AssetIndex
+from core.instrumentation import record
+from core.retriever import TicketRetriever
 
 
 ASSET_BOOST = 0.08  # how much to reduce distance if assets overlap
+BLOCK_SIZE = 1024  # rows of the distance matrix computed per matrix product
+GROUPING_METHODS = ("exact", "faiss")
+
+MAX_GROUP_SIZE = 250  # larger groups are split by split_oversized_groups
+SPLIT_OVERSAMPLE = 4  # k-means clusters per max-size worth of tickets
+SPLIT_MAX_CLUSTERS = 256  # bigger groups are split over several rounds
+SPLIT_SEED = 42
 
 
 def share_asset(ticket_a_assets, ticket_b_assets):
@@ -11,57 +25,231 @@ def share_asset(ticket_a_assets, ticket_b_assets):
     return bool(set(ticket_a_assets) & set(ticket_b_assets))
 
 
+def candidate_pairs(
+    normalized: np.ndarray,
+    cutoff: float,
+    block_size: int = BLOCK_SIZE,
+    starts=None
+):
+    """
+    Yield (rows, cols, distances) for every pair i < j whose cosine
+    distance is <= cutoff, one row block at a time.
+
+    Each block only compares rows [start, stop) against columns
+    [start, n), so memory is bounded by block_size * n regardless of
+    how many tickets there are. starts limits the run to the blocks
+    beginning at those rows (multiples of block_size), e.g. to share
+    the blocks out between processes.
+    """
+    n = normalized.shape[0]
+
+    for start in range(0, n, block_size) if starts is None else starts:
+        stop = min(start + block_size, n)
+
+        similarity = normalized[start:stop] @ normalized[start:].T
+        rows, cols = np.nonzero(similarity >= 1.0 - cutoff)
+
+        upper = cols > rows
+        rows, cols = rows[upper], cols[upper]
+
+        distances = np.clip(1.0 - similarity[rows, cols], 0.0, 2.0)
+        close = distances <= cutoff
+
+        yield rows[close] + start, cols[close] + start, distances[close]
+
+
+def faiss_candidate_pairs(
+    normalized: np.ndarray,
+    cutoff: float,
+    index_type: str = "flat"
+):
+    """
+    (rows, cols, distances) for pairs i < j within cutoff, found by a
+    cosine range search over a FAISS index.
+
+    Like candidate_pairs, only pairs within cutoff are candidates, so
+    asset-sharing pairs need no separate source: the boost is applied
+    to these by boosted_edges. A hot asset mentioned by thousands of
+    tickets therefore costs nothing beyond their near neighbours.
+    """
+    retriever = TicketRetriever(normalized, [], metric="cosine", index_type=index_type)
+    return retriever.neighbor_pairs(cutoff)
+
+
+def boosted_edges(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    distances: np.ndarray,
+    asset_index: AssetIndex,
+    max_distance: float
+) -> np.ndarray:
+    """
+    Mask of the candidate pairs that are edges: within max_distance,
+    or within max_distance + ASSET_BOOST and sharing an asset.
+    """
+    # Asset-aware adjustment: only checked for pairs the boost can reach
+    boosted = distances.copy()
+    far = boosted > max_distance
+    boosted[far] -= ASSET_BOOST * (asset_index.shared_counts(rows[far], cols[far]) > 0)
+
+    return boosted <= max_distance
+
+
+def component_groups(n: int, rows: np.ndarray, cols: np.ndarray) -> list[list[int]]:
+    """
+    Connected components of the edge list, ordered by their lowest index.
+    """
+    graph = coo_matrix(
+        (np.ones(len(rows), dtype=np.int8), (rows, cols)),
+        shape=(n, n)
+    )
+    _, labels = connected_components(graph, directed=False)
+
+    order = np.argsort(labels, kind="stable")
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+    groups = [members.tolist() for members in np.split(order, boundaries)]
+
+    groups.sort(key=lambda members: members[0])
+    return groups
+
+
 def group_by_similarity(
     embeddings: list[list[float]],
     tickets: list[dict],
-    max_distance: float
+    max_distance: float,
+    block_size: int = BLOCK_SIZE,
+    return_distances: bool = True,
+    method: str = "exact",
+    index_type: str = "flat"
 ):
     """
     Deterministic grouping using connected components
     + asset-aware distance adjustment (Hybrid Boost)
-    """
 
-    distance_matrix = cosine_distances(embeddings)
-    n = len(embeddings)
+    method="exact" computes distances in row blocks of block_size.
+    method="faiss" range-searches a FAISS index of the given index_type
+    ("flat", "ivf" or "hnsw") instead; the approximate index types trade
+    a little recall for roughly O(n log n) scaling.
+
+    Only pairs within max_distance + ASSET_BOOST are kept. The second return value
+    is a symmetric sparse CSR matrix of those (unboosted) distances;
+    pairs missing from it are farther apart. It is None when
+    return_distances is False.
+    """
 
-    visited = set()
-    groups = []
+    if method not in GROUPING_METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {GROUPING_METHODS}")
 
-    for i in range(n):
-        if i in visited:
-            continue
+    if len(embeddings) == 0:
+        return [], csr_matrix((0, 0)) if return_distances else None
 
-        stack = [i]
-        group = set()
+    normalized = normalize(np.asarray(embeddings, dtype=np.float64))
+    n = normalized.shape[0]
+    record(items=n)
+    asset_index = AssetIndex.from_tickets(tickets)
 
-        while stack:
-            current = stack.pop()
-            if current in visited:
-                continue
+    pair_rows = []
+    pair_cols = []
+    pair_distances = []
+    edge_rows = []
+    edge_cols = []
 
-            visited.add(current)
-            group.add(current)
+    cutoff = max_distance + ASSET_BOOST
 
-            neighbors = []
+    if method == "faiss":
+        blocks = [faiss_candidate_pairs(normalized, cutoff, index_type)]
+    else:
+        blocks = candidate_pairs(normalized, cutoff, block_size)
 
-            for j in range(n):
-                if j in visited:
-                    continue
+    for rows, cols, distances in blocks:
+        edges = boosted_edges(rows, cols, distances, asset_index, max_distance)
+        edge_rows.append(rows[edges])
+        edge_cols.append(cols[edges])
 
-                distance = distance_matrix[current][j]
+        if return_distances:
+            pair_rows.append(rows)
+            pair_cols.append(cols)
+            pair_distances.append(distances)
 
-                # Asset-aware adjustment
-                if share_asset(
-                    tickets[current]["assets"],
-                    tickets[j]["assets"]
-                ):
-                    distance -= ASSET_BOOST
+    groups = component_groups(
+        n,
+        np.concatenate(edge_rows or [np.zeros(0, dtype=np.intp)]),
+        np.concatenate(edge_cols or [np.zeros(0, dtype=np.intp)])
+    )
 
-                if distance <= max_distance:
-                    neighbors.append(j)
+    if not return_distances:
+        return groups, None
 
-            stack.extend(neighbors)
+    rows = np.concatenate(pair_rows or [np.zeros(0, dtype=np.intp)])
+    cols = np.concatenate(pair_cols or [np.zeros(0, dtype=np.intp)])
+    distances = np.concatenate(pair_distances or [np.zeros(0)])
 
-        groups.append(sorted(group))
+    distance_matrix = csr_matrix(
+        (np.concatenate([distances, distances]),
+         (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+        shape=(n, n)
+    )
 
     return groups, distance_matrix
+
+
+def split_oversized_groups(
+    groups: list[list[int]],
+    embeddings,
+    max_size: int = MAX_GROUP_SIZE,
+    weights=None,
+    seed: int = SPLIT_SEED
+) -> list[list[int]]:
+    """
+    Split groups larger than max_size into tighter sub-groups.
+
+    Connected components are single-linkage, so a chain of close pairs
+    (often via one shared asset) can join hundreds of unrelated
+    tickets. Each oversized group is split with seeded mini-batch
+    k-means on its embeddings, into SPLIT_OVERSAMPLE clusters per
+    max_size tickets (so clusters follow the data rather than being cut
+    to exactly max_size), at most SPLIT_MAX_CLUSTERS at a time. Parts
+    still too large are split again. Groups within the cap are returned
+    unchanged.
+
+    weights[i] is how many tickets row i stands for (see
+    core.dedup.Deduplication.weights); sizes are summed weights, and a
+    single row heavier than max_size stays whole. Groups are returned
+    sorted, ordered by their lowest index, and the result
+    depends only on the inputs and seed.
+    """
+    weights = np.ones(len(embeddings)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if all(weights[group].sum() <= max_size for group in groups):
+        return groups
+
+    normalized = normalize(np.asarray(embeddings, dtype=np.float32))
+    pending = [np.asarray(group, dtype=np.int64) for group in groups]
+    result = []
+    splits = 0
+
+    while pending:
+        members = pending.pop()
+        size = weights[members].sum()
+
+        if size <= max_size or len(members) < 2:
+            result.append(np.sort(members).tolist())
+            continue
+
+        k = int(min(
+            SPLIT_MAX_CLUSTERS, len(members), SPLIT_OVERSAMPLE * np.ceil(size / max_size)
+        ))
+        labels = MiniBatchKMeans(
+            n_clusters=k, random_state=seed, n_init=3, batch_size=1024
+        ).fit_predict(normalized[members], sample_weight=weights[members])
+
+        parts = [members[labels == c] for c in range(k) if (labels == c).any()]
+        if len(parts) < 2:
+            # Identical vectors: k-means can't separate them, so split by position
+            parts = np.array_split(members, k)
+
+        pending.extend(parts)
+        splits += 1
+
+    record(splits=splits)
+    result.sort(key=lambda members: members[0])
+    return result
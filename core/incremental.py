@@ -0,0 +1,346 @@
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from core.grouping import ASSET_BOOST
+from core.retriever import TicketRetriever
+from core.tickets import TicketTable
+
+
+DEFAULT_STATE_DIR = Path("data/state")
+STATE_FILE = "state.json"
+SNAPSHOT_PREFIX = "snapshot-"
+
+
+class IncrementalGrouper:
+    """
+    Keeps connected-component groups up to date as tickets arrive.
+
+    Each new ticket is range-searched against the TicketRetriever index
+    and checked against the tickets sharing one of its assets, and the
+    resulting edges are merged with a union-find. The edge rule is the
+    same as group_by_similarity, so the groups match a full regroup of
+    the same tickets (up to float32 rounding at the threshold).
+
+    Groups whose membership changed since the last mark_analysed() call
+    are reported by changed_groups().
+
+    Tickets are kept in a TicketTable that grows with each ingest, so
+    display_text is only formatted when a ticket is read.
+    """
+
+    def __init__(self, max_distance: float, state_dir=DEFAULT_STATE_DIR):
+        self.max_distance = max_distance
+        self.state_dir = Path(state_dir)
+
+        self.retriever = None
+        self.tickets = TicketTable.empty()
+        self.asset_index = {}  # asset -> indices of tickets mentioning it
+        self._parent = []
+        self._size = []
+        self._members = {}  # root -> members, for groups of two or more
+        self._changed = set()
+
+    def __len__(self):
+        return len(self.tickets)
+
+    # -----------------------------
+    # Union-find
+    # -----------------------------
+    def _find(self, i: int) -> int:
+        root = i
+        while self._parent[root] != root:
+            root = self._parent[root]
+
+        # Path compression
+        while self._parent[i] != root:
+            self._parent[i], i = root, self._parent[i]
+
+        return root
+
+    def _union(self, a: int, b: int) -> int:
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return a
+
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+
+        self._parent[b] = a
+        self._size[a] += self._size[b]
+        # The smaller group's members move, so each ticket moves O(log n) times
+        self._members.setdefault(a, [a]).extend(self._members.pop(b, [b]))
+        return a
+
+    def _grow(self, count: int):
+        start = len(self._parent)
+        self._parent.extend(range(start, start + count))
+        self._size.extend([1] * count)
+
+    # -----------------------------
+    # Ingest
+    # -----------------------------
+    def ingest(self, tickets: TicketTable, embeddings) -> list[int]:
+        """
+        Add tickets (a TicketTable, e.g. from load_tickets or take())
+        with their embeddings and merge them into groups.
+        Returns the indices assigned to the new tickets.
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if len(vectors) == 0:
+            return []
+
+        start = len(self.tickets)
+        new_indices = list(range(start, start + len(vectors)))
+
+        if self.retriever is None:
+            self.retriever = TicketRetriever(vectors, self.tickets, metric="cosine")
+            self.tickets.extend(tickets)
+        else:
+            self.retriever.add(vectors, tickets)
+
+        # The retriever stores the normalized copies
+        vectors = self.retriever.embeddings[start:]
+
+        self._grow(len(vectors))
+
+        for i, ticket in zip(new_indices, tickets):
+            self._changed.add(i)
+            for asset in set(ticket.get("assets") or []):
+                self.asset_index.setdefault(asset, []).append(i)
+
+        for i, j in self._new_edges(vectors, new_indices):
+            self._union(i, j)
+
+        self._changed = {self._find(i) for i in self._changed}
+        return new_indices
+
+    def _new_edges(self, vectors: np.ndarray, new_indices: list[int]):
+        """
+        Yield (new, other) pairs that satisfy the grouping edge rule.
+        """
+        lims, neighbors, _ = self.retriever.find_similar_batch(
+            np.array(new_indices), max_results=None, distance_threshold=self.max_distance
+        )
+
+        for q, i in enumerate(new_indices):
+            for j in neighbors[lims[q]:lims[q + 1]]:
+                yield i, int(j)
+
+            # Asset-aware adjustment for tickets sharing an asset
+            sharing = {
+                j
+                for asset in set(self.tickets[i].get("assets") or [])
+                for j in self.asset_index[asset]
+                if j != i
+            }
+
+            if sharing:
+                others = np.fromiter(sharing, dtype=np.int64)
+                similarity = self.retriever.embeddings[others] @ vectors[q]
+                distance = np.clip(1.0 - similarity, 0.0, 2.0) - ASSET_BOOST
+
+                for j in others[distance <= self.max_distance]:
+                    yield i, int(j)
+
+    # -----------------------------
+    # Groups
+    # -----------------------------
+    def group_members(self, min_size: int = 2) -> dict[int, list[int]]:
+        """
+        Root -> unsorted copy of the members of each group of at least
+        min_size (and at least two) tickets. Copying is much cheaper
+        than sorting large groups, so a caller sharing the grouper can
+        copy under its lock and sort outside it. See singletons() for
+        the rest.
+        """
+        return {root: list(m) for root, m in self._members.items() if len(m) >= min_size}
+
+    def singletons(self) -> np.ndarray:
+        """
+        Indices of the tickets not grouped with any other ticket.
+        """
+        n = len(self._parent)
+        parent = np.fromiter(self._parent, dtype=np.int64, count=n)
+        size = np.fromiter(self._size, dtype=np.int64, count=n)
+        return np.flatnonzero((parent == np.arange(n)) & (size == 1))
+
+    def groups(self, min_size: int = 1) -> list[list[int]]:
+        """
+        Groups of at least min_size tickets as sorted index lists,
+        ordered by their lowest index.
+        """
+        groups = [sorted(m) for m in self.group_members(max(min_size, 2)).values()]
+        if min_size <= 1:
+            groups.extend([i] for i in self.singletons().tolist())
+
+        return sorted(groups, key=lambda group: group[0])
+
+    def group_of(self, i: int, sort: bool = True) -> list[int]:
+        """
+        The members of i's group; with sort=False an unsorted copy.
+        """
+        root = self._find(i)
+        members = list(self._members.get(root, [root]))
+        return sorted(members) if sort else members
+
+    def group_id(self, i: int) -> int:
+        """
+        A member index standing for i's group (its union-find root).
+        It may change as groups merge, but always names a member.
+        """
+        return self._find(i)
+
+    def group_size(self, i: int) -> int:
+        return self._size[self._find(i)]
+
+    def changed_groups(self) -> list[list[int]]:
+        """
+        Groups whose membership changed since the last mark_analysed().
+        """
+        changed = {self._find(i) for i in self._changed}
+        groups = [sorted(self._members.get(root, [root])) for root in changed]
+        return sorted(groups, key=lambda group: group[0])
+
+    def mark_analysed(self, groups: list[list[int]] | None = None):
+        """
+        Clear the changed flag for groups (all groups by default).
+        """
+        if groups is None:
+            self._changed = set()
+        else:
+            done = {self._find(g[0]) for g in groups}
+            self._changed = {r for r in map(self._find, self._changed) if r not in done}
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def snapshot(self) -> dict:
+        """
+        The state save() writes, as it is now. Tickets and embeddings are
+        only ever appended to, so they are shared rather than copied and
+        taking this is cheap: a caller sharing the grouper takes it under
+        its lock and passes it to save() outside the lock.
+        """
+        tickets = self.tickets.copy()
+
+        return {
+            "tickets": tickets,
+            "retriever": None if self.retriever is None else self.retriever.snapshot(tickets),
+            "parent": np.fromiter(self._parent, dtype=np.int64, count=len(self._parent)),
+            "changed": list(self._changed),
+        }
+
+    def save(self, snapshot: dict | None = None):
+        """
+        Write snapshot (by default, snapshot() now) to state_dir: the
+        retriever, union-find and tickets.
+
+        Everything goes into a new snapshot directory first; state.json,
+        which names the snapshot and its ticket count, is then swapped
+        in with os.replace. A save that stops part-way leaves the
+        previous snapshot in use, and superseded snapshots are removed.
+        """
+        state = snapshot if snapshot is not None else self.snapshot()
+
+        # Saved parents point straight at roots
+        roots = state["parent"]
+        while len(roots) and not np.array_equal(roots[roots], roots):
+            roots = roots[roots]
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        snapshot = Path(tempfile.mkdtemp(prefix=SNAPSHOT_PREFIX, dir=self.state_dir))
+
+        try:
+            if state["retriever"] is not None:
+                state["retriever"].save(snapshot / "retriever")
+
+            state["tickets"].save(snapshot / "tickets")
+            np.save(snapshot / "parent.npy", roots)
+
+            fd, temp = tempfile.mkstemp(prefix="state-", suffix=".tmp", dir=self.state_dir)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "max_distance": self.max_distance,
+                        "snapshot": snapshot.name,
+                        "count": len(roots),
+                        "changed": sorted(set(roots[state["changed"]].tolist())),
+                    },
+                    f
+                )
+            os.replace(temp, self.state_dir / STATE_FILE)
+        except BaseException:
+            shutil.rmtree(snapshot, ignore_errors=True)
+            raise
+
+        for path in self.state_dir.glob(SNAPSHOT_PREFIX + "*"):
+            if path != snapshot:
+                shutil.rmtree(path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, state_dir=DEFAULT_STATE_DIR, max_distance: float | None = None):
+        """
+        Restore a grouper saved with save(). A fresh, empty grouper is
+        returned if state_dir holds no saved state. Raises ValueError if
+        the snapshot's parts disagree on the number of tickets.
+        """
+        state_dir = Path(state_dir)
+        state_path = state_dir / STATE_FILE
+
+        if not state_path.exists():
+            if max_distance is None:
+                raise FileNotFoundError(f"No incremental state in {state_dir}")
+            return cls(max_distance, state_dir)
+
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+        if max_distance is not None and max_distance != state["max_distance"]:
+            raise ValueError(
+                f"State in {state_dir} was built with max_distance="
+                f"{state['max_distance']}, not {max_distance}"
+            )
+
+        grouper = cls(state["max_distance"], state_dir)
+        snapshot = state_dir / state["snapshot"]
+        grouper.tickets = TicketTable.load(snapshot / "tickets")
+
+        if grouper.tickets:
+            # Loaded into memory rather than mapped, since ingest appends to it
+            grouper.retriever = TicketRetriever.load(
+                snapshot / "retriever", mmap=False, tickets=grouper.tickets
+            )
+
+        parent = np.load(snapshot / "parent.npy")
+
+        counts = {
+            "state.json": state["count"],
+            "tickets": len(grouper.tickets),
+            "parent.npy": len(parent),
+            "retriever": 0 if grouper.retriever is None else grouper.retriever.index.ntotal,
+        }
+        if len(set(counts.values())) > 1:
+            raise ValueError(f"Incremental state in {state_dir} is inconsistent: {counts}")
+
+        grouper._parent = parent.tolist()
+        grouper._size = np.bincount(parent, minlength=len(parent)).tolist()
+
+        order = np.argsort(parent, kind="stable")
+        boundaries = np.flatnonzero(np.diff(parent[order])) + 1
+        for members in np.split(order, boundaries) if len(parent) else []:
+            if len(members) > 1:
+                grouper._members[int(parent[members[0]])] = members.tolist()
+        grouper._changed = set(state["changed"])
+
+        # Rebuilt from the tickets rather than saved
+        table = grouper.tickets
+        for i in range(len(table)):
+            for asset in table.assets(i):
+                grouper.asset_index.setdefault(asset, []).append(i)
+
+        return grouper
@@ -0,0 +1,251 @@
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+REPORT_DIR = Path("data/reports")
+PROFILERS = ("cprofile", "pyinstrument")
+COUNTERS = ("items", "tokens", "cache_hits", "cache_misses")
+
+# Per thread (and so per Streamlit session); see bind() for worker pools
+_active = contextvars.ContextVar("active_run", default=None)
+_lock = threading.Lock()
+
+
+def _peak_rss_mb() -> float | None:
+    """
+    Peak resident set size of the process so far, in MiB.
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    if sys.platform == "darwin":
+        peak /= 1024
+
+    return round(peak / 1024, 1)
+
+
+class RunReport:
+    """
+    Wall time, memory and counters for each stage of one pipeline run.
+
+    Stages are opened with stage(); library code adds items, tokens and
+    cache hits to the innermost open stage through record(). Peak
+    resident memory is always reported; trace_memory adds tracemalloc's
+    per-stage peak of Python allocations, at a noticeable slowdown.
+    profile="cprofile" or "pyinstrument" profiles each top-level stage
+    into profile_dir.
+    """
+
+    def __init__(
+        self,
+        name: str = "run",
+        trace_memory: bool = False,
+        profile: str | None = None,
+        profile_dir=REPORT_DIR
+    ):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profile!r}, expected one of {PROFILERS}")
+
+        self.name = name
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.profile_dir = Path(profile_dir)
+        self.started = datetime.now(timezone.utc)
+        self.stages = []
+        self._open = []
+
+    def _start_profiler(self):
+        if self.profile == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        return profiler
+
+    def _stop_profiler(self, profiler, stage_name: str) -> str:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.profile_dir / f"{self.name}-{stage_name}"
+
+        if self.profile == "pyinstrument":
+            profiler.stop()
+            path = stem.with_suffix(".html")
+            path.write_text(profiler.output_html(), encoding="utf-8")
+        else:
+            profiler.disable()
+            path = stem.with_suffix(".prof")
+            profiler.dump_stats(str(path))
+
+        return str(path)
+
+    def _bump_traced_peak(self):
+        """
+        Fold tracemalloc's peak into every open stage before it is reset.
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        for open_stage in self._open:
+            open_stage["_traced_peak"] = max(open_stage["_traced_peak"], peak)
+
+    @contextmanager
+    def stage(self, name: str, **counters):
+        """
+        Time the enclosed block as one stage and yield its record (a dict).
+        """
+        record = {"stage": name, "depth": len(self._open), **{key: 0 for key in COUNTERS}}
+        record.update(counters)
+
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            self._bump_traced_peak()
+            tracemalloc.reset_peak()
+            record["_traced_peak"] = 0
+
+        # Profilers can't nest, so only top-level stages are profiled
+        profiler = self._start_profiler() if self.profile and not self._open else None
+
+        # Listed in start order, so a stage precedes the stages nested in it
+        with _lock:
+            self._open.append(record)
+            self.stages.append(record)
+
+        start = time.perf_counter()
+
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+
+            if profiler is not None:
+                record["profile"] = self._stop_profiler(profiler, name)
+
+            if tracing:
+                self._bump_traced_peak()
+                record["peak_traced_mb"] = round(record.pop("_traced_peak") / 2**20, 1)
+
+            record["peak_rss_mb"] = _peak_rss_mb()
+
+            with _lock:
+                self._open.remove(record)
+
+    def record(self, **counters):
+        """
+        Add counters to the innermost open stage. Safe to call from threads.
+        """
+        with _lock:
+            if not self._open:
+                return
+            current = self._open[-1]
+            for key, value in counters.items():
+                current[key] = current.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "started": self.started.isoformat(),
+            "total_seconds": round(
+                sum(s.get("seconds", 0) for s in self.stages if s["depth"] == 0), 4
+            ),
+            "stages": self.stages,
+        }
+
+    def save(self, path=None) -> Path:
+        """
+        Write the report as JSON, by default to REPORT_DIR/<name>-<timestamp>.json.
+        """
+        if path is None:
+            stamp = self.started.strftime("%Y%m%dT%H%M%SZ")
+            path = REPORT_DIR / f"{self.name}-{stamp}.json"
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+        return path
+
+    def summary(self) -> str:
+        """
+        Plain-text table of the stages, for console output.
+        """
+        lines = [
+            f"{'stage':<20} {'seconds':>9} {'items':>9} {'tokens':>9} "
+            f"{'cache hits':>10} {'peak RSS MB':>12}"
+        ]
+
+        for s in self.stages:
+            label = "  " * s["depth"] + s["stage"]
+            lines.append(
+                f"{label:<20} {s['seconds']:>9.2f} {s['items']:>9} {s['tokens']:>9} "
+                f"{s['cache_hits']:>10} {s['peak_rss_mb'] or '-':>12}"
+            )
+
+        return "\n".join(lines)
+
+
+@contextmanager
+def activate(report: RunReport):
+    """
+    Make report the target of record() for the duration of the block.
+    """
+    token = _active.set(report)
+
+    started_tracing = report.trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    try:
+        yield report
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _active.reset(token)
+
+
+def active_run() -> RunReport | None:
+    return _active.get()
+
+
+def bind(fn):
+    """
+    Wrap fn so that, run on a worker thread, it records into the run
+    that is active where bind() was called.
+    """
+    report = _active.get()
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        token = _active.set(report)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _active.reset(token)
+
+    return bound
+
+
+def record(**counters):
+    """
+    Add counters to the current stage of the active run; a no-op otherwise.
+    """
+    report = _active.get()
+    if report is not None:
+        report.record(**counters)
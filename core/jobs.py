@@ -0,0 +1,180 @@
+import threading
+from concurrent.futures import Executor
+
+from core.analysis import analyse_groups
+from core.analysis_cache import AnalysisCache
+from core.assets import sanitize_text
+from core.embedding_cache import EmbeddingCache
+from core.grouping import MAX_GROUP_SIZE
+from core.instrumentation import RunReport, activate
+from core.pipeline import group_tickets
+from core.result_cache import ResultCache, result_key
+from core.tickets import TicketTable
+
+
+MIN_GROUP_SIZE = 2  # every group this size or larger is analysed
+
+
+class AnalysisJob:
+    """
+    The online pipeline (embed, group, analyse) running in the background.
+
+    Results are published on the job as they arrive, so a UI can poll
+    snapshot() and show each group as soon as its analysis is ready.
+    All groups of MIN_GROUP_SIZE or more are analysed, so a caller can
+    filter to a larger minimum afterwards without re-running anything.
+
+    Deduplication, embedding and grouping are group_tickets(), as in
+    the command-line scripts. With dedup, near-duplicate tickets are
+    collapsed before embedding and grouping, and expanded again in the
+    published groups.
+
+    With a result_cache and the upload's content hash, embeddings and
+    groups are reused from earlier jobs on the same export.
+    """
+
+    def __init__(
+        self,
+        tickets: TicketTable,
+        max_distance: float,
+        max_descriptions: int,
+        embedding_cache: EmbeddingCache | None = None,
+        analysis_cache: AnalysisCache | None = None,
+        refresh: bool = False,
+        report: RunReport | None = None,
+        result_cache: ResultCache | None = None,
+        upload_hash: str | None = None,
+        dedup: bool = True,
+        max_group_size: int = MAX_GROUP_SIZE,
+        workers: int = 1
+    ):
+        self.tickets = tickets
+        self.max_distance = max_distance
+        self.max_descriptions = max_descriptions
+        self.embedding_cache = embedding_cache
+        self.analysis_cache = analysis_cache
+        self.refresh = refresh
+        self.report = report or RunReport("job")
+        self.result_cache = result_cache if upload_hash is not None else None
+        self.upload_hash = upload_hash
+        self.dedup = dedup
+        self.max_group_size = max_group_size
+        self.workers = workers
+
+        self.stage = "queued"
+        self.groups = []  # groups of MIN_GROUP_SIZE or more, in grouping order
+        self.analyses = {}  # index into groups -> analysis dict
+        self.errors = {}  # index into groups -> error message
+        self.representatives = 0  # tickets embedded, i.e. left after dedup
+        self.embeddings_cached = 0
+        self.error = None  # exception that stopped the whole job
+
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._future = None
+
+    def start(self, executor: Executor) -> "AnalysisJob":
+        self._future = executor.submit(self._run)
+        return self
+
+    def cancel(self):
+        """
+        Stop at the next group; analyses already running are abandoned.
+        """
+        self._cancelled.set()
+
+    @property
+    def done(self) -> bool:
+        return self.stage in ("done", "failed", "cancelled")
+
+    def snapshot(self) -> dict:
+        """
+        Consistent copy of the job's progress for rendering.
+        """
+        with self._lock:
+            return {
+                "stage": self.stage,
+                "groups": self.groups,
+                "analyses": dict(self.analyses),
+                "errors": dict(self.errors),
+                "representatives": self.representatives,
+                "embeddings_cached": self.embeddings_cached,
+                "error": self.error,
+            }
+
+    def _run(self):
+        try:
+            with activate(self.report):
+                self._pipeline()
+        except Exception as e:
+            with self._lock:
+                self.error = e
+                self.stage = "failed"
+
+    def _cached(self, kind: str, compute, **params):
+        """
+        compute(), or its earlier result for this upload and params.
+        """
+        if self.result_cache is None:
+            return compute(), False
+
+        key = result_key(kind, upload_hash=self.upload_hash, **params)
+        value = self.result_cache.get(key)
+        if value is not None:
+            return value, True
+
+        value = compute()
+        self.result_cache.put(key, value)
+        return value, False
+
+    def _set_stage(self, stage: str):
+        self.stage = stage
+
+    def _pipeline(self):
+        result = group_tickets(
+            self.tickets,
+            self.max_distance,
+            self.report,
+            dedup=self.dedup,
+            workers=self.workers,
+            embedding_cache=self.embedding_cache,
+            max_group_size=self.max_group_size,
+            cached=self._cached,
+            progress=self._set_stage
+        )
+
+        with self._lock:
+            self.representatives = len(result.duplicates)
+            self.embeddings_cached = result.embeddings_cached
+            self.groups = [g for g in result.groups if len(g) >= MIN_GROUP_SIZE]
+            self.stage = "analysing"
+
+        # Apply sanitisation BEFORE sending to LLM
+        descriptions_per_group = result.descriptions(
+            self.groups,
+            lambda i: sanitize_text(self.tickets[i]["embedding_text"]),
+            max_items=self.max_descriptions
+        )
+
+        with self.report.stage("analyse"):
+            completed = analyse_groups(
+                descriptions_per_group,
+                cache=self.analysis_cache,
+                refresh=self.refresh
+            )
+
+            try:
+                for index, analysis, error in completed:
+                    with self._lock:
+                        if error is not None:
+                            self.errors[index] = str(error)
+                        else:
+                            self.analyses[index] = analysis
+
+                    if self._cancelled.is_set():
+                        self.stage = "cancelled"
+                        return
+            finally:
+                completed.close()
+
+        self.stage = "done"
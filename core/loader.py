@@ -1,21 +1,32 @@
+import numpy as np
 import pandas as pd
-import re
+from pathlib import Path
+
+from core.assets import AssetVocabulary, extract_assets, extract_assets_batch
+from core.instrumentation import record
+from core.tickets import HEADER_FIELDS, TicketTable, encode_column
+
+
+DESCRIPTION_FIELDS = [
+    "Long Description",
+    "Short Description",
+    "Issue Description",
+    "Description",
+    "Issue description",
+    "Summary",
+]
+
+DISPLAY_FIELDS = ["Ticket ID"] + HEADER_FIELDS
+
+CHUNK_SIZE = 50_000  # rows per chunk when streaming large exports
+NO_DESCRIPTION = "no description provided"
 
 
 def find_description_fields(row: dict):
     """
     Tries to locate description-like fields defensively.
     """
-    possible_keys = [
-        "Long Description",
-        "Short Description",
-        "Issue Description",
-        "Description",
-        "Issue description",
-        "Summary",
-    ]
-
-    for key in possible_keys:
+    for key in DESCRIPTION_FIELDS:
         if key in row:
             value = row.get(key)
             if value is not None:
@@ -26,72 +37,184 @@ def find_description_fields(row: dict):
     return None
 
 
-def extract_assets(text: str):
+def _as_text(df: pd.DataFrame, column: str) -> pd.Series:
     """
-    Extract IPs, hostnames, URLs and server-like tokens.
+    Column formatted the way str(row.get(column)) would format each cell.
     """
+    if column not in df.columns:
+        return pd.Series("None", index=df.index, dtype=object)
 
-    assets = set()
+    return df[column].astype(object).map(str)
 
-    if not text:
-        return []
 
-    # IP address pattern
-    ip_pattern = r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b"
+def resolve_descriptions(df: pd.DataFrame) -> pd.Series:
+    """
+    Column-wise find_description_fields: the first description-like
+    column with a usable value, lower-cased. Missing rows are None.
+    """
+    descriptions = pd.Series(None, index=df.index, dtype=object)
+
+    for column in DESCRIPTION_FIELDS:
+        if column not in df.columns:
+            continue
 
-    # URL pattern
-    url_pattern = r"https?://[^\s]+"
+        text = _as_text(df, column).str.strip()
+        usable = (
+            df[column].notna()
+            & (text != "")
+            & (text.str.lower() != "nan")
+            & descriptions.isna()
+        )
+        descriptions[usable] = text[usable].str.lower()
 
-    # Hostname / server-like pattern (server01, auth-prod-01, etc.)
-    hostname_pattern = r"\b[a-zA-Z0-9\-]{3,}\.(?:com|net|org|local|corp|internal)\b"
-    server_pattern = r"\b(?:srv|server|auth|ping|iam|dc|mfa)[a-zA-Z0-9\-]*\b"
+    return descriptions
 
-    matches = (
-        re.findall(ip_pattern, text)
-        + re.findall(url_pattern, text)
-        + re.findall(hostname_pattern, text)
-        + re.findall(server_pattern, text)
+
+def table_from_frame(df: pd.DataFrame) -> TicketTable:
+    """
+    Build a TicketTable from a DataFrame with column-wise operations.
+    """
+    record(items=len(df))
+
+    descriptions = resolve_descriptions(df).fillna(NO_DESCRIPTION)
+
+    if "Ticket ID" in df.columns:
+        ticket_ids = df["Ticket ID"].to_numpy(dtype=object)
+    else:
+        ticket_ids = np.full(len(df), None, dtype=object)
+
+    descriptions = descriptions.to_numpy(dtype=object)
+    vocabulary = AssetVocabulary()
+    asset_offsets, asset_ids = vocabulary.encode(extract_assets_batch(descriptions))
+
+    return TicketTable(
+        ticket_ids,
+        {column: encode_column(_as_text(df, column)) for column in HEADER_FIELDS},
+        descriptions,
+        asset_offsets,
+        asset_ids,
+        vocabulary
     )
 
-    for m in matches:
-        assets.add(m.lower())
 
-    return list(assets)
+def tickets_from_frame(df: pd.DataFrame) -> list[dict]:
+    """
+    Ticket dicts for a DataFrame, with display_text formatted up front.
+    """
+    return table_from_frame(df).to_records()
 
 
-def load_excel_tickets(path: str):
-    df = pd.read_excel(path)
+def _file_format(path) -> str:
+    """
+    "xlsx", "csv" or "parquet", from the path or an upload's file name.
+    """
+    name = getattr(path, "name", path)
+    suffix = Path(str(name)).suffix.lower()
+
+    if suffix in (".csv", ".txt"):
+        return "csv"
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    return "xlsx"
+
+
+def _excel_frame(rows: list, header: tuple) -> pd.DataFrame:
+    """
+    DataFrame for a chunk of openpyxl rows, with empty cells as NaN the
+    way read_excel reports them. Column types are inferred per chunk.
+    """
+    df = pd.DataFrame(rows, columns=header)
+    return df.where(df.notna(), float("nan"))
+
 
-    tickets = []
+def _iter_excel_frames(path, chunk_size: int):
+    """
+    Stream an Excel sheet in row chunks through openpyxl read-only mode.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        chunk = []
+        blank = []
+        for row in rows:
+            # Like read_excel, keep blank rows between data but drop trailing ones
+            if all(cell is None for cell in row):
+                blank.append(row)
+                continue
+
+            chunk.extend(blank)
+            chunk.append(row)
+            blank = []
 
-    for _, row in df.iterrows():
-        row_dict = row.to_dict()
+            if len(chunk) >= chunk_size:
+                yield _excel_frame(chunk, header)
+                chunk = []
 
-        canonical_description = find_description_fields(row_dict)
+        if chunk:
+            yield _excel_frame(chunk, header)
+    finally:
+        workbook.close()
 
-        if canonical_description is None:
-            canonical_description = "no description provided"
 
-        assets = extract_assets(canonical_description)
+def _iter_parquet_frames(path, chunk_size: int):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading .parquet exports needs pyarrow: pip install pyarrow") from None
 
-        ticket = {
-            "ticket_id": row_dict.get("Ticket ID"),
-            "display_text": (
-                f"Ticket Summary\n"
-                f"--------------\n"
-                f"Ticket ID: {row_dict.get('Ticket ID')}\n"
-                f"Date Created: {row_dict.get('Date Created')}\n"
-                f"Department: {row_dict.get('Department')}\n"
-                f"Assigned To: {row_dict.get('Assigned To')}\n"
-                f"Priority: {row_dict.get('Priority')}\n"
-                f"Status: {row_dict.get('Status')}\n\n"
-                f"Issue Description:\n"
-                f"{canonical_description}"
-            ),
-            "embedding_text": canonical_description,
-            "assets": assets
-        }
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
 
-        tickets.append(ticket)
 
-    return tickets
+def iter_frames(path, chunk_size: int = CHUNK_SIZE):
+    """
+    Raw DataFrames of chunk_size rows from an .xlsx, .csv or .parquet
+    export, read without loading the whole file.
+    """
+    file_format = _file_format(path)
+
+    if file_format == "csv":
+        return pd.read_csv(path, chunksize=chunk_size)
+    if file_format == "parquet":
+        return _iter_parquet_frames(path, chunk_size)
+    return _iter_excel_frames(path, chunk_size)
+
+
+def iter_ticket_chunks(path, chunk_size: int = CHUNK_SIZE):
+    """
+    Yield TicketTables of chunk_size rows without reading the whole
+    export into memory. Accepts .xlsx, .csv and .parquet.
+    """
+    for df in iter_frames(path, chunk_size):
+        yield table_from_frame(df)
+
+
+def load_tickets(path, chunk_size: int | None = None) -> TicketTable:
+    """
+    Load tickets from an .xlsx, .csv or .parquet export (path or upload).
+    With chunk_size, the file is streamed in chunks instead of read whole.
+    """
+    if chunk_size is not None:
+        return TicketTable.concat(list(iter_ticket_chunks(path, chunk_size)))
+
+    file_format = _file_format(path)
+
+    if file_format == "csv":
+        df = pd.read_csv(path)
+    elif file_format == "parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_excel(path)
+
+    return table_from_frame(df)
+
+
+def load_excel_tickets(path: str):
+    return load_tickets(path)
@@ -0,0 +1,163 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+DEFAULT_STORE_PATH = Path("data/offline/offline_results.sqlite")
+LEGACY_JSON_PATH = Path("data/offline/offline_results.json")
+
+
+def write_offline_store(results: Iterable[dict], path=DEFAULT_STORE_PATH) -> Path:
+    """
+    Write offline groups (dicts shaped like offline_results.json entries)
+    to a SQLite file: one row per group with its size and analysis, and
+    the tickets in a separate table keyed by group.
+
+    The file is built next to path and moved into place, so a reader
+    never sees a half-written store.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp file, so concurrent writers can't clobber each other's
+    fd, temp = tempfile.mkstemp(prefix=f"{path.stem}-", suffix=".tmp", dir=path.parent)
+    os.close(fd)
+
+    try:
+        _write_store(results, temp)
+        os.replace(temp, path)
+    except BaseException:
+        Path(temp).unlink(missing_ok=True)
+        raise
+
+    return path
+
+
+def _write_store(results: Iterable[dict], path):
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE groups (
+                group_number INTEGER PRIMARY KEY,
+                size INTEGER NOT NULL,
+                analysis TEXT
+            );
+            CREATE TABLE tickets (
+                group_number INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                display_text TEXT,
+                embedding_text TEXT,
+                PRIMARY KEY (group_number, position)
+            ) WITHOUT ROWID;
+            """
+        )
+
+        for group in results:
+            tickets = group.get("tickets", [])
+            conn.execute(
+                "INSERT INTO groups VALUES (?, ?, ?)",
+                (group["group_number"], len(tickets), json.dumps(group.get("analysis")))
+            )
+            conn.executemany(
+                "INSERT INTO tickets VALUES (?, ?, ?, ?)",
+                (
+                    (group["group_number"], position,
+                     t.get("display_text"), t.get("embedding_text"))
+                    for position, t in enumerate(tickets)
+                )
+            )
+
+        conn.execute("CREATE INDEX groups_size ON groups (size)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def convert_json_results(json_path=LEGACY_JSON_PATH, path=DEFAULT_STORE_PATH) -> Path:
+    """
+    One-off conversion of an offline_results.json file to the store.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        results = json.load(f)
+
+    if not isinstance(results, list):
+        raise ValueError(f"{json_path} is not a list of groups")
+
+    return write_offline_store(results, path)
+
+
+class OfflineStore:
+    """
+    Read-only view of an offline results store.
+
+    Opening it reads nothing; group headers are fetched a page at a time
+    and a group's tickets only when asked for, so the cost of showing
+    results does not grow with the size of the file.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = Path(path)
+
+        if not self.path.exists():
+            raise FileNotFoundError(self.path)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            f"file:{self.path.resolve()}?mode=ro", uri=True, check_same_thread=False
+        )
+
+    def count(self, min_size: int = 1) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM groups WHERE size >= ?", (min_size,)
+            ).fetchone()[0]
+
+    def groups(
+        self,
+        min_size: int = 1,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> list[dict]:
+        """
+        Groups of at least min_size tickets, in group order, without
+        their tickets: {"group_number", "size", "analysis"}.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT group_number, size, analysis FROM groups
+                WHERE size >= ? ORDER BY group_number LIMIT ? OFFSET ?
+                """,
+                (min_size, -1 if limit is None else limit, offset)
+            ).fetchall()
+
+        return [
+            {
+                "group_number": number,
+                "size": size,
+                "analysis": json.loads(analysis) if analysis else None
+            }
+            for number, size, analysis in rows
+        ]
+
+    def tickets(self, group_number: int) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT display_text, embedding_text FROM tickets
+                WHERE group_number = ? ORDER BY position
+                """,
+                (group_number,)
+            ).fetchall()
+
+        return [
+            {"display_text": display_text, "embedding_text": embedding_text}
+            for display_text, embedding_text in rows
+        ]
+
+    def close(self):
+        self._conn.close()
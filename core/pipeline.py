@@ -0,0 +1,157 @@
+import numpy as np
+
+from core.dedup import Deduplication, deduplicate
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import embed_texts, get_backend
+from core.grouping import MAX_GROUP_SIZE, group_by_similarity, split_oversized_groups
+from core.instrumentation import RunReport, record
+from core.loader import load_tickets
+from core.representatives import group_descriptions
+from core.sharded import group_by_similarity_sharded, load_tickets_sharded
+from core.tickets import TicketTable
+
+
+def add_pipeline_arguments(parser):
+    """
+    The --no-dedup and --workers options of the command-line pipelines.
+    """
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="embed and group every ticket instead of collapsing near-duplicates first"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes for loading and grouping (0 = one per core)"
+    )
+
+
+def load_export(path, workers: int = 1) -> TicketTable:
+    """
+    load_tickets(path), parsed in worker processes unless workers is 1.
+    """
+    if workers == 1:
+        return load_tickets(path)
+    return load_tickets_sharded(path, workers)
+
+
+class GroupedTickets:
+    """
+    Result of group_tickets().
+
+    groups are groups of ticket indices, each sorted, ordered by their
+    lowest index, singletons included. duplicates maps the tickets onto
+    the representatives that were embedded; embeddings has one row per
+    representative, embeddings_cached of which came from a cache.
+    """
+
+    def __init__(
+        self,
+        duplicates: Deduplication,
+        embeddings: np.ndarray,
+        groups: list[list[int]],
+        embeddings_cached: int
+    ):
+        self.duplicates = duplicates
+        self.embeddings = embeddings
+        self.groups = groups
+        self.embeddings_cached = embeddings_cached
+
+    def descriptions(self, groups, text, max_items: int | None = None) -> list[list[str]]:
+        """
+        Diverse text(i) descriptions for each of groups, within the
+        prompt token budget.
+        """
+        return group_descriptions(
+            groups,
+            text,
+            self.embeddings,
+            labels=self.duplicates.labels,
+            max_items=max_items
+        )
+
+
+def _uncached(kind: str, compute, **params):
+    return compute(), False
+
+
+def group_tickets(
+    tickets: TicketTable,
+    max_distance: float,
+    report: RunReport,
+    dedup: bool = True,
+    workers: int = 1,
+    embedding_cache: EmbeddingCache | None = None,
+    max_group_size: int = MAX_GROUP_SIZE,
+    cached=None,
+    progress=None
+) -> GroupedTickets:
+    """
+    Group tickets by description similarity: collapse near-duplicates
+    (with dedup), embed the representatives, group them, split oversized
+    groups and expand the duplicates again. Each step is a stage of
+    report, which must be the active run. With workers other than 1,
+    grouping runs in worker processes.
+
+    cached(kind, compute, **params) -> (value, reused) may return an
+    earlier result of a step instead of computing it, e.g. from
+    AnalysisJob's result cache. progress(step) is called as each step
+    starts, with "deduplicating", "embedding" or "grouping".
+    """
+    cached = cached or _uncached
+    progress = progress or (lambda step: None)
+
+    progress("deduplicating")
+    with report.stage("dedup") as stage:
+        if dedup:
+            duplicates, _ = cached("dedup", lambda: deduplicate(list(tickets.descriptions)))
+        else:
+            duplicates = Deduplication.identity(len(tickets))
+        representatives = duplicates.representative_tickets(tickets)
+        stage["representatives"] = len(representatives)
+
+    progress("embedding")
+    texts = list(representatives.descriptions)
+    model = get_backend().model
+
+    with report.stage("embed") as stage:
+        embeddings, reused = cached(
+            "embeddings",
+            lambda: np.asarray(embed_texts(texts, cache=embedding_cache), dtype=np.float32),
+            model=model,
+            dedup=dedup
+        )
+        if reused:
+            record(items=len(texts), cache_hits=len(texts))
+
+    embeddings_cached = stage["cache_hits"]
+
+    def grouped():
+        if workers == 1:
+            groups, _ = group_by_similarity(
+                embeddings, representatives, max_distance, return_distances=False
+            )
+        else:
+            groups = group_by_similarity_sharded(
+                embeddings, representatives, max_distance, workers
+            )
+        # Break up chained mega-groups before expanding duplicates
+        groups = split_oversized_groups(
+            groups, embeddings, max_group_size, weights=duplicates.weights
+        )
+        return duplicates.expand(groups)
+
+    progress("grouping")
+    with report.stage("group"):
+        groups, _ = cached(
+            "groups",
+            grouped,
+            model=model,
+            max_distance=max_distance,
+            dedup=dedup,
+            max_group_size=max_group_size
+        )
+
+    return GroupedTickets(duplicates, embeddings, groups, embeddings_cached)
@@ -0,0 +1,128 @@
+from typing import Callable, Sequence
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from core.embeddings import estimate_tokens
+
+
+PROMPT_TOKEN_BUDGET = 2000  # description tokens per analyse_group prompt
+DESCRIPTION_TOKEN_LIMIT = 400  # longer descriptions are truncated
+DESCRIPTION_OVERHEAD = 8  # tokens of list marker and "(n similar tickets)" note
+DUPLICATE_DISTANCE = 1e-4  # cosine distance below which tickets count as the same
+
+
+def clean_description(text: str, max_tokens: int = DESCRIPTION_TOKEN_LIMIT) -> str:
+    """
+    Description without blank or repeated lines, truncated to roughly
+    max_tokens (by estimate_tokens' ~3 bytes per token).
+    """
+    lines = []
+    seen = set()
+
+    for line in (text or "").splitlines():
+        key = " ".join(line.split()).lower()
+        if key and key not in seen:
+            seen.add(key)
+            lines.append(line.rstrip())
+
+    text = "\n".join(lines)
+
+    if estimate_tokens(text) > max_tokens:
+        text = text.encode("utf-8")[:max_tokens * 3].decode("utf-8", errors="ignore") + "..."
+
+    return text
+
+
+def select_representatives(
+    vectors,
+    texts: Sequence[str],
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+    max_items: int | None = None
+) -> list[int]:
+    """
+    Positions of a diverse sample of texts within token_budget.
+
+    The medoid (the text most similar to the rest) comes first, then
+    repeatedly the text farthest from everything chosen so far, so the
+    sample spreads over the group instead of repeating its first few
+    tickets. Texts that are identical, or whose vectors are, are never
+    chosen twice.
+    """
+    m = len(texts)
+    if m == 0:
+        return []
+
+    unit = normalize(np.asarray(vectors, dtype=np.float32))
+    costs = np.array([estimate_tokens(t) + DESCRIPTION_OVERHEAD for t in texts])
+
+    ids = {}
+    text_ids = np.array([ids.setdefault(t, len(ids)) for t in texts])
+
+    candidate = int(np.argmax(unit @ unit.sum(axis=0)))
+    chosen = []
+    budget = token_budget
+    nearest = np.full(m, np.inf)  # distance to the nearest chosen text
+    excluded = np.zeros(m, dtype=bool)
+
+    while True:
+        chosen.append(candidate)
+        budget -= costs[candidate]
+        excluded |= text_ids == text_ids[candidate]
+
+        if max_items is not None and len(chosen) >= max_items:
+            break
+
+        nearest = np.minimum(nearest, 1.0 - unit @ unit[candidate])
+        eligible = ~excluded & (nearest > DUPLICATE_DISTANCE) & (costs <= budget)
+        if not eligible.any():
+            break
+
+        candidate = int(np.argmax(np.where(eligible, nearest, -np.inf)))
+
+    return chosen
+
+
+def group_descriptions(
+    groups: Sequence[Sequence[int]],
+    text: Callable[[int], str],
+    embeddings,
+    labels: Sequence[int] | None = None,
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+    max_items: int | None = None
+) -> list[list[str]]:
+    """
+    Cleaned, budgeted descriptions to send to analyse_group for each
+    group of ticket indices.
+
+    text(i) gives ticket i's description. embeddings[labels[i]] is its
+    vector (labels maps tickets onto deduplicated representatives; by
+    default ticket i is row i). Only one ticket per representative is
+    considered. A description standing in for several tickets (those
+    nearest to it) says how many.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    labels = np.arange(len(embeddings)) if labels is None else np.asarray(labels)
+
+    result = []
+
+    for group in groups:
+        group = np.asarray(group, dtype=np.int64)
+        _, first, counts = np.unique(labels[group], return_index=True, return_counts=True)
+        order = np.argsort(first)
+        candidates = group[first[order]]
+        counts = counts[order]
+
+        vectors = normalize(embeddings[labels[candidates]])
+        texts = [clean_description(text(i)) for i in candidates]
+        chosen = select_representatives(vectors, texts, token_budget, max_items)
+
+        nearest = np.argmax(vectors @ vectors[chosen].T, axis=1)
+        represented = np.bincount(nearest, weights=counts, minlength=len(chosen)).astype(int)
+
+        result.append([
+            texts[position] if n == 1 else f"{texts[position]} ({n} similar tickets)"
+            for position, n in zip(chosen, represented)
+        ])
+
+    return result
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # in-memory budget
+DEFAULT_SPILL_DIR = Path("data/cache/results")
+DEFAULT_MAX_DISK_BYTES = 4 * 1024 * 1024 * 1024
+SIZE_SAMPLE = 200  # list items pickled to estimate a list's size
+
+
+def result_key(kind: str, **params) -> str:
+    """
+    Cache key for one kind of result ("tickets", "embeddings", ...) and
+    the parameters it depends on, such as the upload hash and model.
+    """
+    payload = json.dumps([kind, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_bytes(value) -> int:
+    """
+    Rough in-memory size: exact for arrays, reported by objects with an
+    nbytes attribute (e.g. TicketTable), sampled for long lists.
+    """
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+
+    if isinstance(value, (list, tuple)) and len(value) > SIZE_SAMPLE:
+        sample = value[:SIZE_SAMPLE]
+        per_item = len(pickle.dumps(sample, pickle.HIGHEST_PROTOCOL)) / SIZE_SAMPLE
+        return int(per_item * len(value)) + sys.getsizeof(value)
+
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class ResultCache:
+    """
+    Byte-budgeted LRU cache of pipeline results (parsed tickets,
+    embeddings, groups) shared across Streamlit reruns and sessions.
+
+    Entries evicted from memory are pickled to spill_dir, if given, and
+    read back (and promoted) on the next get. The spill directory is
+    itself trimmed oldest-first to max_disk_bytes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        spill_dir=None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES
+    ):
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()  # key -> (value, size), oldest first
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _spill_path(self, key: str) -> Path:
+        return self.spill_dir / f"{key}.pkl"
+
+    def get(self, key: str):
+        """
+        Cached value or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            value = self._read_spilled(key)
+            if value is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._store(key, value)
+            return value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_compute(self, key: str, compute):
+        """
+        Cached value, or compute() stored under key.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _store(self, key: str, value):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+
+        size = estimate_bytes(value)
+        self._entries[key] = (value, size)
+        self._bytes += size
+
+        # Evict least recently used entries, but never the one just stored
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, (old_value, old_size) = self._entries.popitem(last=False)
+            self._bytes -= old_size
+            self._spill(old_key, old_value)
+
+    def _spill(self, key: str, value):
+        if self.spill_dir is None:
+            return
+
+        path = self._spill_path(key)
+        temp = path.with_suffix(".tmp")
+
+        with open(temp, "wb") as f:
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+
+        self._trim_disk()
+
+    def _read_spilled(self, key: str):
+        if self.spill_dir is None:
+            return None
+
+        path = self._spill_path(key)
+
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        path.unlink(missing_ok=True)
+        return value
+
+    def _trim_disk(self):
+        files = sorted(self.spill_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+
+        for path in files:
+            if total <= self.max_disk_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
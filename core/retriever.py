@@ -1,17 +1,124 @@
+import json
 import faiss
 import numpy as np
+from pathlib import Path
 from typing import List, Dict, Tuple
 
 
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+QUERY_BATCH_SIZE = 4096  # queries per range_search call
+
+EMBEDDINGS_FILE = "embeddings.npy"
+INDEX_FILE = "index.faiss"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Maps flat index codes straight from the file where FAISS supports it
+_MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def _build_index(dim: int, metric: str, index_type: str, n: int, nprobe: int, hnsw_m: int):
+    """
+    Create an empty FAISS index. Cosine uses inner product on unit vectors.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index_type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(dim, hnsw_m, faiss_metric)
+
+    if index_type == "ivf":
+        quantizer = faiss.IndexFlatIP(dim) if metric == "cosine" else faiss.IndexFlatL2(dim)
+        # FAISS wants ~39 training points per list
+        nlist = max(1, min(int(4 * np.sqrt(n)), n // 39))
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss_metric)
+        index.nprobe = nprobe
+        return index
+
+    return faiss.IndexFlatIP(dim) if metric == "cosine" else faiss.IndexFlatL2(dim)
+
+
 class TicketRetriever:
-    def __init__(self, embeddings: List[List[float]], tickets: List[Dict]):
+    """
+    FAISS index over ticket embeddings.
+
+    metric="l2" (the default) reports squared L2 distances. metric="cosine"
+    normalizes the vectors, searches by inner product and reports cosine
+    distances (1 - similarity). index_type picks an exact "flat" index or
+    an approximate "ivf" / "hnsw" one for large corpora.
+    """
+
+    def __init__(
+        self,
+        embeddings: List[List[float]],
+        tickets: List[Dict],
+        metric: str = "l2",
+        index_type: str = "flat",
+        nprobe: int = 16,
+        hnsw_m: int = 32,
+    ):
+        if metric not in ("l2", "cosine"):
+            raise ValueError(f"Unknown metric {metric!r}, expected 'l2' or 'cosine'")
+
         self.embeddings = np.array(embeddings).astype("float32")
         self.tickets = tickets
+        self.metric = metric
+        self.index_type = index_type
+        self.model = None
+        self.read_only = False
+
+        if metric == "cosine":
+            faiss.normalize_L2(self.embeddings)
+
+        self._buffer = self.embeddings
 
         dim = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
+        self.index = _build_index(
+            dim, metric, index_type, len(self.embeddings), nprobe, hnsw_m
+        )
+
+        if not self.index.is_trained:
+            self.index.train(self.embeddings)
+
         self.index.add(self.embeddings)
 
+    def add(self, embeddings: List[List[float]], tickets: List[Dict]):
+        """
+        Append tickets to the index without rebuilding it.
+        """
+        if self.read_only:
+            raise RuntimeError(
+                "This retriever was loaded with mmap=True and is read-only; "
+                "load it with mmap=False to add tickets."
+            )
+
+        vectors = np.array(embeddings).astype("float32").reshape(-1, self.embeddings.shape[1])
+        n = len(self.embeddings)
+
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+
+        # Grow the backing buffer geometrically so repeated small adds
+        # don't copy the whole matrix each time
+        if n + len(vectors) > len(self._buffer):
+            capacity = max(2 * len(self._buffer), n + len(vectors))
+            buffer = np.empty((capacity, self.embeddings.shape[1]), dtype="float32")
+            buffer[:n] = self.embeddings
+            self._buffer = buffer
+
+        self._buffer[n:n + len(vectors)] = vectors
+        self.embeddings = self._buffer[:n + len(vectors)]
+
+        self.index.add(vectors)
+        self.tickets.extend(tickets)
+
+    def _to_distances(self, scores: np.ndarray) -> np.ndarray:
+        if self.metric == "cosine":
+            return np.clip(1.0 - scores, 0.0, 2.0)
+        return scores
+
     def find_similar(
         self,
         query_index: int,
@@ -23,12 +130,222 @@ class TicketRetriever:
         """
         query_vector = self.embeddings[query_index].reshape(1, -1)
         distances, indices = self.index.search(query_vector, max_results)
+        distances = self._to_distances(distances)
 
         results = []
         for idx, dist in zip(indices[0], distances[0]):
-            if idx == query_index:
+            if idx == query_index or idx < 0:
                 continue
             if dist <= distance_threshold:
                 results.append((idx, dist))
 
         return results
+
+    def find_similar_batch(
+        self,
+        queries,
+        max_results: int | None = 10,
+        distance_threshold: float = 1.1,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        find_similar for many queries with a single FAISS call.
+
+        queries is either a 1-D array of ticket indices (each query skips
+        itself) or a 2-D array of raw query vectors. With max_results=None
+        every ticket within distance_threshold is returned (range search).
+
+        Returns compact (lims, indices, distances) arrays: the results for
+        query q are indices[lims[q]:lims[q + 1]], nearest first.
+        """
+        queries = np.asarray(queries)
+
+        if queries.ndim == 1:
+            query_indices = queries.astype(np.int64)
+            vectors = self.embeddings[query_indices]
+        else:
+            query_indices = None
+            vectors = queries.astype("float32").reshape(-1, self.embeddings.shape[1])
+            if self.metric == "cosine":
+                vectors = vectors.copy()
+                faiss.normalize_L2(vectors)
+
+        if max_results is None:
+            if self.metric == "cosine":
+                radius = 1.0 - distance_threshold - 1e-6
+            else:
+                radius = distance_threshold + 1e-6
+
+            lims, scores, indices = self.index.range_search(vectors, radius)
+            owners = np.repeat(np.arange(len(vectors)), np.diff(lims).astype(np.int64))
+            distances = self._to_distances(scores)
+
+            keep = distances <= distance_threshold
+            if query_indices is not None:
+                keep &= indices != query_indices[owners]
+
+            # Range search results are unordered; sort each query by distance
+            order = np.lexsort((distances[keep], owners[keep]))
+            counts = np.bincount(owners[keep], minlength=len(vectors))
+
+            return (
+                np.concatenate([[0], np.cumsum(counts)]),
+                indices[keep][order],
+                distances[keep][order],
+            )
+
+        scores, indices = self.index.search(vectors, max_results)
+        distances = self._to_distances(scores)
+
+        keep = (indices >= 0) & (distances <= distance_threshold)
+        if query_indices is not None:
+            keep &= indices != query_indices[:, None]
+
+        return (
+            np.concatenate([[0], np.cumsum(keep.sum(axis=1))]),
+            indices[keep],
+            distances[keep],
+        )
+
+    def neighbor_pairs(
+        self,
+        max_distance: float,
+        batch_size: int = QUERY_BATCH_SIZE
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Range-search every ticket against the index and return the
+        (rows, cols, distances) of all pairs i < j within max_distance.
+        """
+        if self.metric == "cosine":
+            # Inner-product range search keeps similarities above the radius
+            radius = 1.0 - max_distance - 1e-6
+        else:
+            radius = max_distance + 1e-6
+
+        rows = []
+        cols = []
+        distances = []
+
+        for start in range(0, len(self.embeddings), batch_size):
+            queries = self.embeddings[start:start + batch_size]
+            lims, scores, neighbors = self.index.range_search(queries, radius)
+
+            query_rows = np.repeat(
+                np.arange(start, start + len(queries)), np.diff(lims).astype(np.int64)
+            )
+            scores = self._to_distances(scores)
+
+            # Approximate indexes may find a pair from only one side,
+            # so keep both directions and fold them onto i < j below
+            keep = (neighbors != query_rows) & (scores <= max_distance)
+            rows.append(np.minimum(query_rows[keep], neighbors[keep]))
+            cols.append(np.maximum(query_rows[keep], neighbors[keep]))
+            distances.append(scores[keep])
+
+        rows = np.concatenate(rows or [np.zeros(0, dtype=np.int64)])
+        cols = np.concatenate(cols or [np.zeros(0, dtype=np.int64)])
+        distances = np.concatenate(distances or [np.zeros(0, dtype=np.float32)])
+
+        _, first = np.unique(rows * len(self.embeddings) + cols, return_index=True)
+        return rows[first], cols[first], distances[first]
+
+    def snapshot(self, tickets: List[Dict] | None = None) -> "TicketRetriever":
+        """
+        A read-only copy of the retriever as it is now, to save() while
+        this one keeps growing. Take it while add() is held off, e.g.
+        under the lock that guards it.
+
+        add() never rewrites stored rows, so the embeddings are shared
+        rather than copied. A flat index holds nothing but those rows and
+        is rebuilt from them by save(); other index types are cloned here.
+        """
+        retriever = TicketRetriever.__new__(TicketRetriever)
+        retriever.metric = self.metric
+        retriever.index_type = self.index_type
+        retriever.model = self.model
+        retriever.read_only = True
+
+        retriever.embeddings = self.embeddings
+        retriever._buffer = self.embeddings
+        retriever.index = None if self.index_type == "flat" else faiss.clone_index(self.index)
+        retriever.tickets = tickets if tickets is not None else self.tickets
+
+        return retriever
+
+    def save(self, directory, model: str | None = None):
+        """
+        Write the float32 embeddings (.npy), the FAISS index and a manifest
+        with ticket IDs, the embedding model and the index settings.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        index = self.index
+        if index is None:
+            # A snapshot's flat index, rebuilt from its rows
+            index = _build_index(
+                self.embeddings.shape[1], self.metric, "flat", len(self.embeddings), 0, 0
+            )
+            index.add(self.embeddings)
+
+        np.save(directory / EMBEDDINGS_FILE, np.ascontiguousarray(self.embeddings))
+        faiss.write_index(index, str(directory / INDEX_FILE))
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "model": model if model is not None else self.model,
+            "metric": self.metric,
+            "index_type": self.index_type,
+            "dim": int(self.embeddings.shape[1]),
+            "count": int(len(self.embeddings)),
+            "ticket_ids": [t.get("ticket_id") for t in self.tickets],
+        }
+
+        with open(directory / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, default=str)
+
+    @classmethod
+    def load(
+        cls,
+        directory,
+        mmap: bool = True,
+        model: str | None = None,
+        tickets: List[Dict] | None = None
+    ) -> "TicketRetriever":
+        """
+        Open a retriever written by save() without rebuilding the index.
+
+        With mmap=True the embeddings and (for flat indexes) the index
+        codes are memory-mapped, so opening is near-instant and several
+        processes share the pages; such a retriever is read-only. Pass
+        model to refuse an index built with a different embedding model.
+        Without tickets, each ticket is a {"ticket_id": ...} stub.
+        """
+        directory = Path(directory)
+
+        with open(directory / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if model is not None and manifest["model"] != model:
+            raise ValueError(
+                f"Index in {directory} was built with {manifest['model']!r}, not {model!r}"
+            )
+
+        retriever = cls.__new__(cls)
+        retriever.metric = manifest["metric"]
+        retriever.index_type = manifest["index_type"]
+        retriever.model = manifest["model"]
+        retriever.read_only = mmap
+
+        retriever.embeddings = np.load(
+            directory / EMBEDDINGS_FILE, mmap_mode="r" if mmap else None
+        )
+        retriever._buffer = retriever.embeddings
+        retriever.index = faiss.read_index(
+            str(directory / INDEX_FILE), _MMAP_FLAG if mmap else 0
+        )
+        retriever.tickets = (
+            tickets if tickets is not None
+            else [{"ticket_id": ticket_id} for ticket_id in manifest["ticket_ids"]]
+        )
+
+        return retriever
@@ -0,0 +1,89 @@
+import random
+import threading
+import time
+
+import openai
+
+
+MAX_RETRIES = 5
+BASE_DELAY = 0.5  # seconds before the first retry
+MAX_DELAY = 30.0
+
+
+def is_rate_limit(exc: Exception) -> bool:
+    return isinstance(exc, openai.RateLimitError)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    429s, 5xx responses and connection problems are worth retrying.
+    """
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500
+    return False
+
+
+def _retry_delay(exc: Exception, attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Exponential backoff with full jitter, or the server's Retry-After.
+    """
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), max_delay)
+    except ValueError:
+        pass
+
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class Backpressure:
+    """
+    Shared pause honoured by every worker once any of them is rate limited,
+    so a 429 slows the whole pool down instead of one thread.
+    """
+
+    def __init__(self):
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def call_with_retries(
+    fn,
+    retries: int = MAX_RETRIES,
+    base_delay: float = BASE_DELAY,
+    max_delay: float = MAX_DELAY,
+    backpressure: Backpressure | None = None
+):
+    """
+    Call fn(), retrying transient API errors with exponential backoff.
+    """
+    for attempt in range(retries + 1):
+        if backpressure is not None:
+            backpressure.wait()
+
+        try:
+            return fn()
+        except Exception as exc:
+            if attempt == retries or not is_retryable(exc):
+                raise
+
+            delay = _retry_delay(exc, attempt, base_delay, max_delay)
+
+            if backpressure is not None and is_rate_limit(exc):
+                backpressure.pause(delay)
+
+            time.sleep(delay)
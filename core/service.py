@@ -0,0 +1,715 @@
+import asyncio
+import json
+import math
+import threading
+import traceback
+from urllib.parse import parse_qs
+
+import numpy as np
+import pandas as pd
+
+from core.analysis import MAX_CONCURRENCY, analyse_group, create_client
+from core.analysis_cache import AnalysisCache
+from core.embedding_cache import EmbeddingCache
+from core.embeddings import EmbeddingBackend, embed_texts
+from core.incremental import STATE_FILE, IncrementalGrouper
+from core.loader import table_from_frame, tickets_from_frame
+from core.representatives import group_descriptions
+from core.retry import Backpressure
+
+
+INGEST_BATCH_SIZE = 256  # tickets embedded and grouped together
+INGEST_BATCH_WAIT = 0.05  # seconds a partial ingest batch waits for more tickets
+QUERY_BATCH_SIZE = 16  # text queries per batch; each adds a scan of the index
+QUERY_BATCH_WAIT = 0.002  # kept short so a lone query still answers quickly
+QUEUE_SIZE = 10_000  # queued tickets or queries before requests get a 503
+SAVE_INTERVAL = 30.0  # seconds between saves of newly ingested state
+SIMILAR_LIMIT = 10
+MAX_DESCRIPTIONS_PER_GROUP = 8
+MAX_BODY_BYTES = 10 * 1024 * 1024
+RETRY_AFTER = 1  # seconds, sent with 503 responses
+
+
+class QueueFull(Exception):
+    """
+    The work queue has no room for the request; retry later.
+    """
+
+
+class AnalysisFailed(Exception):
+    """
+    The LLM request for a group analysis failed after retries.
+    """
+
+
+def _ticket_row(row) -> dict:
+    """
+    Copy of an ingested row with its Ticket ID as given or None if it
+    has none (missing, null or NaN). Raises ValueError for a row that
+    isn't an object of strings, numbers and nulls, or whose Ticket ID
+    isn't a string or number.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Each ticket must be an object")
+
+    for column, value in row.items():
+        if value is not None and not isinstance(value, (str, int, float)):
+            raise ValueError(f"{column!r} must be a string, number or null")
+
+    ticket_id = row.get("Ticket ID")
+    if isinstance(ticket_id, float) and math.isnan(ticket_id):
+        ticket_id = None
+    if isinstance(ticket_id, bool):
+        raise ValueError("'Ticket ID' must be a string, number or null")
+
+    return {**row, "Ticket ID": ticket_id}
+
+
+class _Batcher:
+    """
+    Bounded queue whose items are handled in batches by one worker.
+
+    The worker takes up to batch_size queued items, waiting at most
+    wait seconds for a partial batch to fill, and runs
+    handler(items) -> results in a thread so the event loop stays free.
+    Items arriving while a batch runs make up the next one. If handler
+    raises, every item in the batch gets the exception, so items are
+    validated before they are submitted.
+    """
+
+    def __init__(self, handler, batch_size: int, wait: float, queue_size: int):
+        self.handler = handler
+        self.batch_size = batch_size
+        self.wait = wait
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.batches = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def submit(self, items: list) -> list:
+        """
+        Results for items, in order. All of items are queued or none:
+        QueueFull is raised if they don't fit.
+        """
+        if len(items) > self.queue.maxsize:
+            raise ValueError(f"At most {self.queue.maxsize} items per request")
+        if self.queue.qsize() + len(items) > self.queue.maxsize:
+            raise QueueFull(f"{self.queue.qsize()} items already queued")
+
+        loop = asyncio.get_running_loop()
+        futures = []
+
+        for item in items:
+            future = loop.create_future()
+            self.queue.put_nowait((item, future))
+            futures.append(future)
+
+        return await asyncio.gather(*futures)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.wait
+
+            while len(batch) < self.batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests that were cancelled (e.g. the client went away) are skipped
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            self.batches += 1
+
+            try:
+                results = await asyncio.to_thread(self.handler, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class TicketService:
+    """
+    Long-running front end to an IncrementalGrouper.
+
+    The grouper's tickets, embedding matrix, retriever index and groups
+    stay in memory between requests. Ingested tickets and text queries
+    go through bounded queues and are embedded in batches; similarity
+    queries by ticket index are answered straight from the index.
+
+    Calls into the grouper run in worker threads under one lock, so
+    searches never see an index half-way through an add. Embedding,
+    LLM analysis and writing saved state happen outside the lock. Newly
+    ingested state is saved every save_interval seconds and on stop().
+    """
+
+    def __init__(
+        self,
+        grouper: IncrementalGrouper,
+        backend: EmbeddingBackend,
+        embedding_cache: EmbeddingCache | None = None,
+        analysis_cache: AnalysisCache | None = None,
+        ingest_batch_size: int = INGEST_BATCH_SIZE,
+        ingest_batch_wait: float = INGEST_BATCH_WAIT,
+        query_batch_size: int = QUERY_BATCH_SIZE,
+        query_batch_wait: float = QUERY_BATCH_WAIT,
+        queue_size: int = QUEUE_SIZE,
+        save_interval: float | None = SAVE_INTERVAL,
+        max_descriptions: int = MAX_DESCRIPTIONS_PER_GROUP
+    ):
+        self.grouper = grouper
+        self.backend = backend
+        self.embedding_cache = embedding_cache
+        self.analysis_cache = analysis_cache
+        self.save_interval = save_interval
+        self.max_descriptions = max_descriptions
+
+        self.ingest_batches = _Batcher(
+            self._ingest_batch, ingest_batch_size, ingest_batch_wait, queue_size
+        )
+        self.query_batches = _Batcher(
+            self._query_batch, query_batch_size, query_batch_wait, queue_size
+        )
+
+        self._lock = threading.Lock()
+        self._saving = threading.Lock()  # one save at a time
+        self._unsaved = 0
+        self._save_task = None
+        self._analyses = None
+
+        # One client and backoff shared by all analyses, as in analyse_groups
+        try:
+            self._client = create_client()
+        except RuntimeError:
+            # No API key: cached analyses are still served, others fail
+            self._client = None
+        self._backpressure = Backpressure()
+
+        self._known = {
+            ticket_id: i
+            for i, ticket_id in enumerate(grouper.tickets.ticket_ids.tolist())
+            if ticket_id is not None
+        }
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    async def start(self):
+        self._analyses = asyncio.Semaphore(MAX_CONCURRENCY)
+        self.ingest_batches.start()
+        self.query_batches.start()
+        if self.save_interval:
+            self._save_task = asyncio.create_task(self._save_periodically())
+
+    async def stop(self):
+        """
+        Stop taking work and save what was ingested.
+        """
+        await self.ingest_batches.stop()
+        await self.query_batches.stop()
+        if self._save_task is not None:
+            self._save_task.cancel()
+            await asyncio.gather(self._save_task, return_exceptions=True)
+        await asyncio.to_thread(self.save)
+
+    def save(self):
+        """
+        Save the grouper if anything was ingested since the last save.
+        Only the snapshot is taken under the lock; it is written outside
+        it, so queries carry on while the files are written.
+        """
+        with self._saving:
+            with self._lock:
+                if not self._unsaved and (self.grouper.state_dir / STATE_FILE).exists():
+                    return
+                snapshot = self.grouper.snapshot()
+                saved = self._unsaved
+
+            self.grouper.save(snapshot)
+
+            with self._lock:
+                self._unsaved -= saved
+
+    async def _save_periodically(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            if self._unsaved:
+                await asyncio.to_thread(self.save)
+
+    def health(self) -> dict:
+        return {
+            "tickets": len(self.grouper),
+            "model": self.backend.model,
+            "ingest_queue": self.ingest_batches.queue.qsize(),
+            "query_queue": self.query_batches.queue.qsize(),
+            "ingest_batches": self.ingest_batches.batches,
+            "query_batches": self.query_batches.batches,
+            "unsaved": self._unsaved,
+        }
+
+    # -----------------------------
+    # Ingest
+    # -----------------------------
+    async def ingest(self, rows: list[dict]) -> list[dict]:
+        """
+        Add tickets given as rows in the export's column layout
+        ("Ticket ID", "Short Description", ...). Returns each ticket's
+        index and group; a Ticket ID seen before is not added again.
+
+        Rows are checked before they are queued, so a malformed row
+        fails only its own request, not the others batched with it.
+        """
+        return await self.ingest_batches.submit([_ticket_row(row) for row in rows])
+
+    def _ingest_batch(self, rows: list[dict]) -> list[dict]:
+        table = table_from_frame(pd.DataFrame(rows))
+        # IDs come from the rows as given, with missing ones as None: the
+        # frame's column may be read-only, and a missing ID turns integer
+        # IDs into floats there
+        ticket_ids = np.empty(len(rows), dtype=object)
+        ticket_ids[:] = [row["Ticket ID"] for row in rows]
+        table.ticket_ids = ticket_ids
+
+        # Only this worker adds tickets, so _known can be read unlocked
+        indices = [None] * len(table)
+        new = []  # rows to add
+        pending = {}  # row -> its ticket's position in new
+        slots = {}  # Ticket ID -> position in new, for IDs repeated in the batch
+
+        for row, ticket_id in enumerate(ticket_ids):
+            if ticket_id in self._known:
+                indices[row] = self._known[ticket_id]
+            elif ticket_id is not None and ticket_id in slots:
+                pending[row] = slots[ticket_id]
+            else:
+                if ticket_id is not None:
+                    slots[ticket_id] = len(new)
+                pending[row] = len(new)
+                new.append(row)
+
+        if new:
+            tickets = table.take(new)
+            embeddings = embed_texts(
+                list(tickets.descriptions), cache=self.embedding_cache, backend=self.backend
+            )
+
+        with self._lock:
+            if new:
+                added = self.grouper.ingest(tickets, embeddings)
+                self.grouper.retriever.model = self.backend.model
+                self._unsaved += len(added)
+
+                for i, ticket_id in zip(added, tickets.ticket_ids):
+                    if ticket_id is not None:
+                        self._known[ticket_id] = i
+                for row, position in pending.items():
+                    indices[row] = added[position]
+
+            return [
+                {
+                    "index": i,
+                    "ticket_id": self.grouper.tickets[i]["ticket_id"],
+                    "group": self.grouper.group_id(i),
+                    "group_size": self.grouper.group_size(i),
+                }
+                for i in indices
+            ]
+
+    # -----------------------------
+    # Similarity
+    # -----------------------------
+    def _check_index(self, index: int):
+        if not 0 <= index < len(self.grouper):
+            raise LookupError(f"No ticket {index}")
+
+    def _matches(self, indices, distances) -> list[dict]:
+        return [
+            {
+                "index": int(j),
+                "ticket_id": self.grouper.tickets[j]["ticket_id"],
+                "distance": float(d),
+                "group": self.grouper.group_id(int(j)),
+            }
+            for j, d in zip(indices, distances)
+        ]
+
+    async def similar(
+        self,
+        index: int,
+        k: int = SIMILAR_LIMIT,
+        max_distance: float | None = None
+    ) -> list[dict]:
+        """
+        The k nearest tickets to ticket index within max_distance
+        (cosine; by default the grouping threshold).
+        """
+        if max_distance is None:
+            max_distance = self.grouper.max_distance
+        return await asyncio.to_thread(self._similar, index, k, max_distance)
+
+    def _similar(self, index: int, k: int, max_distance: float) -> list[dict]:
+        with self._lock:
+            self._check_index(index)
+            # The ticket itself is dropped from its own results
+            lims, indices, distances = self.grouper.retriever.find_similar_batch(
+                np.array([index]), max_results=k + 1, distance_threshold=max_distance
+            )
+            return self._matches(indices[:k], distances[:k])
+
+    async def similar_text(
+        self,
+        text: str,
+        k: int = SIMILAR_LIMIT,
+        max_distance: float | None = None
+    ) -> list[dict]:
+        """
+        The k nearest tickets to a description that isn't ingested,
+        within max_distance as for similar().
+        """
+        if max_distance is None:
+            max_distance = self.grouper.max_distance
+        [result] = await self.query_batches.submit([(text, k, max_distance)])
+        return result
+
+    def _query_batch(self, queries: list[tuple]) -> list[list[dict]]:
+        # Same description preparation as ingested tickets
+        texts = [
+            t["embedding_text"]
+            for t in tickets_from_frame(pd.DataFrame({"Description": [q[0] for q in queries]}))
+        ]
+        vectors = embed_texts(texts, cache=self.embedding_cache, backend=self.backend)
+
+        with self._lock:
+            if len(self.grouper) == 0:
+                return [[] for _ in queries]
+
+            lims, indices, distances = self.grouper.retriever.find_similar_batch(
+                np.asarray(vectors, dtype=np.float32),
+                max_results=min(max(q[1] for q in queries), len(self.grouper)),
+                distance_threshold=max(q[2] for q in queries)
+            )
+
+            results = []
+            for q, (_, k, max_distance) in enumerate(queries):
+                start, stop = lims[q], lims[q + 1]
+                close = distances[start:stop] <= max_distance
+                results.append(self._matches(
+                    indices[start:stop][close][:k], distances[start:stop][close][:k]
+                ))
+
+            return results
+
+    # -----------------------------
+    # Groups
+    # -----------------------------
+    async def groups(self, min_size: int = 2, limit: int = 100, offset: int = 0) -> dict:
+        return await asyncio.to_thread(self._groups, min_size, limit, offset)
+
+    def _groups(self, min_size: int, limit: int, offset: int) -> dict:
+        # Members are copied under the lock; ordering and sorting happen outside it
+        with self._lock:
+            groups = self.grouper.group_members(max(min_size, 2))
+            singletons = (
+                self.grouper.singletons() if min_size <= 1 else np.zeros(0, dtype=np.int64)
+            )
+
+        roots = np.concatenate([np.fromiter(groups, dtype=np.int64, count=len(groups)), singletons])
+        firsts = np.concatenate([
+            np.fromiter((min(m) for m in groups.values()), dtype=np.int64, count=len(groups)),
+            singletons
+        ])
+        page = roots[np.argsort(firsts, kind="stable")[offset:offset + limit]].tolist()
+
+        return {
+            "total": len(roots),
+            "groups": [
+                {
+                    "group": root,
+                    "size": len(groups.get(root, [root])),
+                    "tickets": sorted(groups.get(root, [root])),
+                }
+                for root in page
+            ],
+        }
+
+    async def group(self, index: int, limit: int = 100, offset: int = 0) -> dict:
+        """
+        The group of ticket index, with the ticket ID and text of a
+        page of its members (in index order).
+        """
+        return await asyncio.to_thread(self._group, index, limit, offset)
+
+    def _group(self, index: int, limit: int, offset: int) -> dict:
+        group, members = self._members(index)
+        # Ingest only appends to the tickets, so reading them needs no lock
+        tickets = self.grouper.tickets
+
+        return {
+            "group": group,
+            "size": len(members),
+            "tickets": [
+                {
+                    "index": i,
+                    "ticket_id": tickets[i]["ticket_id"],
+                    "display_text": tickets[i]["display_text"],
+                }
+                for i in members[offset:offset + limit]
+            ],
+        }
+
+    def _members(self, index: int, with_embeddings: bool = False) -> tuple:
+        """
+        (group_id, sorted members) of ticket index's group, plus the
+        embedding matrix with_embeddings. Only the copy is made under
+        the lock; large groups are sorted outside it. Ingest only
+        appends rows, so the matrix taken here stays valid for them.
+        """
+        with self._lock:
+            self._check_index(index)
+            group = self.grouper.group_id(index)
+            members = self.grouper.group_of(index, sort=False)
+            embeddings = self.grouper.retriever.embeddings
+
+        members.sort()
+        return (group, members, embeddings) if with_embeddings else (group, members)
+
+    async def group_analysis(self, index: int, refresh: bool = False) -> dict:
+        """
+        LLM analysis of ticket index's group, from the analysis cache
+        unless its membership changed or refresh is set. At most
+        MAX_CONCURRENCY analyses run at once.
+        """
+        group, members, descriptions = await asyncio.to_thread(self._group_descriptions, index)
+
+        async with self._analyses:
+            try:
+                analysis = await asyncio.to_thread(
+                    analyse_group,
+                    descriptions,
+                    client=self._client,
+                    backpressure=self._backpressure,
+                    cache=self.analysis_cache,
+                    refresh=refresh
+                )
+            except Exception as e:
+                raise AnalysisFailed(str(e)) from e
+
+        if "error" not in analysis:
+            await asyncio.to_thread(self._mark_analysed, members)
+
+        return {"group": group, "size": len(members), "analysis": analysis}
+
+    def _group_descriptions(self, index: int):
+        group, members, embeddings = self._members(index, with_embeddings=True)
+        if len(members) < 2:
+            raise ValueError(f"Ticket {index} is not grouped with any other ticket")
+
+        tickets = self.grouper.tickets
+        [descriptions] = group_descriptions(
+            [members],
+            lambda i: tickets[i]["embedding_text"],
+            embeddings,
+            max_items=self.max_descriptions
+        )
+        return group, members, descriptions
+
+    def _mark_analysed(self, members: list[int]):
+        with self._lock:
+            self.grouper.mark_analysed([members])
+
+
+# -----------------------------
+# ASGI app
+# -----------------------------
+def _response(status: int, body, headers: list | None = None) -> tuple:
+    # The body is encoded by the app, off the event loop
+    return status, body, headers or []
+
+
+def _encode(body) -> bytes:
+    return json.dumps(body, default=str).encode("utf-8")
+
+
+def _int_param(params: dict, name: str, default: int, minimum: int = 0) -> int:
+    try:
+        value = int(params.get(name, [default])[0])
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return value
+
+
+def _float_param(params: dict, name: str, default: float | None) -> float | None:
+    value = params.get(name, [None])[0]
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise OverflowError(f"Request body over {MAX_BODY_BYTES} bytes")
+        if not message.get("more_body"):
+            return body
+
+
+async def _route(service: TicketService, method: str, parts: list, params: dict, receive):
+    """
+    (status, body, headers) for one request.
+
+    GET  /health
+    POST /tickets                    {"tickets": [row, ...]} or [row, ...]
+    GET  /tickets/{index}/similar    ?k=&max_distance=
+    POST /similar                    {"text": ..., "k": ..., "max_distance": ...}
+    GET  /groups                     ?min_size=&limit=&offset=
+    GET  /groups/{index}             the group containing ticket index, ?limit=&offset=
+    GET  /groups/{index}/analysis    ?refresh=1
+    """
+    if method == "GET" and parts == ["health"]:
+        return _response(200, service.health())
+
+    if method == "POST" and parts in (["tickets"], ["similar"]):
+        try:
+            payload = json.loads(await _read_body(receive) or b"null")
+        except json.JSONDecodeError:
+            raise ValueError("Body must be JSON")
+
+        if parts == ["tickets"]:
+            rows = payload.get("tickets") if isinstance(payload, dict) else payload
+            if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+                raise ValueError('Expected a list of ticket objects or {"tickets": [...]}')
+            return _response(200, {"tickets": await service.ingest(rows)})
+
+        if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+            raise ValueError('Expected {"text": "..."}')
+        k = _int_param({"k": [payload.get("k", SIMILAR_LIMIT)]}, "k", SIMILAR_LIMIT, 1)
+        max_distance = _float_param(
+            {"max_distance": [payload.get("max_distance")]}, "max_distance", None
+        )
+        return _response(
+            200, {"similar": await service.similar_text(payload["text"], k, max_distance)}
+        )
+
+    if method == "GET" and len(parts) >= 2 and parts[0] in ("tickets", "groups"):
+        try:
+            index = int(parts[1])
+        except ValueError:
+            return _response(404, {"error": "Not found"})
+
+        if parts[0] == "tickets" and parts[2:] == ["similar"]:
+            k = _int_param(params, "k", SIMILAR_LIMIT, 1)
+            max_distance = _float_param(params, "max_distance", None)
+            return _response(200, {"similar": await service.similar(index, k, max_distance)})
+
+        if parts[0] == "groups" and len(parts) == 2:
+            return _response(200, await service.group(
+                index, _int_param(params, "limit", 100), _int_param(params, "offset", 0)
+            ))
+
+        if parts[0] == "groups" and parts[2:] == ["analysis"]:
+            refresh = params.get("refresh", ["0"])[0] not in ("0", "false", "")
+            return _response(200, await service.group_analysis(index, refresh))
+
+    if method == "GET" and parts == ["groups"]:
+        return _response(200, await service.groups(
+            _int_param(params, "min_size", 2, 1),
+            _int_param(params, "limit", 100),
+            _int_param(params, "offset", 0)
+        ))
+
+    return _response(404, {"error": "Not found"})
+
+
+def create_app(service: TicketService):
+    """
+    ASGI application serving service (see _route for the endpoints).
+    The service is started and stopped with the server's lifespan.
+    """
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await service.start()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await service.stop()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] != "http":
+            return
+
+        parts = [part for part in scope["path"].split("/") if part]
+        params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+        try:
+            status, body, headers = await _route(
+                service, scope["method"], parts, params, receive
+            )
+        except QueueFull as e:
+            status, body, headers = _response(
+                503, {"error": str(e)}, [(b"retry-after", str(RETRY_AFTER).encode())]
+            )
+        except (ValueError, TypeError) as e:
+            status, body, headers = _response(400, {"error": str(e)})
+        except LookupError as e:
+            status, body, headers = _response(404, {"error": str(e)})
+        except OverflowError as e:
+            status, body, headers = _response(413, {"error": str(e)})
+        except AnalysisFailed as e:
+            status, body, headers = _response(
+                502, {"error": "LLM request failed", "raw_response": str(e)}
+            )
+        except Exception as e:
+            traceback.print_exc()
+            status, body, headers = _response(500, {"error": str(e)})
+
+        body = await asyncio.to_thread(_encode, body)
+
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ] + headers,
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    return app
@@ -0,0 +1,146 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.preprocessing import normalize
+
+from core.assets import AssetIndex
+from core.grouping import (
+    ASSET_BOOST,
+    BLOCK_SIZE,
+    boosted_edges,
+    candidate_pairs,
+    component_groups,
+)
+from core.instrumentation import record
+from core.loader import CHUNK_SIZE, iter_frames, table_from_frame
+from core.tickets import TicketTable
+
+
+# Set in each worker process by _init_worker
+_worker = {}
+
+
+def worker_count(workers: int | None) -> int:
+    """
+    workers, or every core for None or 0.
+    """
+    return workers or os.cpu_count() or 1
+
+
+def load_tickets_sharded(
+    path,
+    workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE
+) -> TicketTable:
+    """
+    load_tickets(path, chunk_size) with each chunk turned into a
+    TicketTable (descriptions, header fields, assets) in a worker
+    process. The file itself is still read by this process.
+    """
+    with ProcessPoolExecutor(max_workers=worker_count(workers)) as pool:
+        tables = list(pool.map(table_from_frame, iter_frames(path, chunk_size)))
+
+    table = TicketTable.concat(tables)
+    record(items=len(table))
+    return table
+
+
+def _init_worker(name: str, shape: tuple, asset_index: AssetIndex):
+    # Pool workers share the parent's resource tracker, so attaching
+    # doesn't make the block's lifetime theirs; the parent unlinks it
+    shm = SharedMemory(name=name)
+    _worker["shm"] = shm
+    _worker["normalized"] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker["asset_index"] = asset_index
+
+
+def _block_forest(start: int, max_distance: float, block_size: int):
+    """
+    Components of one row block's edges, as (nodes, roots) where roots
+    holds the lowest node of each node's component. This is all the
+    merge needs, and is at most one pair per ticket in the block's
+    edges instead of every edge.
+    """
+    rows, cols, distances = next(candidate_pairs(
+        _worker["normalized"], max_distance + ASSET_BOOST, block_size, starts=[start]
+    ))
+    edges = boosted_edges(rows, cols, distances, _worker["asset_index"], max_distance)
+    rows, cols = rows[edges], cols[edges]
+
+    nodes, local = np.unique(np.concatenate([rows, cols]), return_inverse=True)
+    if len(nodes) == 0:
+        return nodes, nodes
+
+    graph = coo_matrix(
+        (np.ones(len(rows), dtype=np.int8), (local[:len(rows)], local[len(rows):])),
+        shape=(len(nodes), len(nodes))
+    )
+    _, labels = connected_components(graph, directed=False)
+
+    roots = np.full(labels.max() + 1, len(_worker["normalized"]), dtype=nodes.dtype)
+    np.minimum.at(roots, labels, nodes)
+
+    return nodes, roots[labels]
+
+
+def group_by_similarity_sharded(
+    embeddings,
+    tickets,
+    max_distance: float,
+    workers: int | None = None,
+    block_size: int = BLOCK_SIZE
+) -> list[list[int]]:
+    """
+    The groups of group_by_similarity(..., method="exact"), computed
+    in worker processes.
+
+    The normalized embeddings are copied once into shared memory, which
+    every worker maps instead of receiving a pickled copy. Row blocks
+    are handed out one at a time, so the long early blocks and short
+    late ones balance out. Each worker reduces its block's edges to
+    (node, root) pairs; the reduce step joins those pairs across
+    blocks, which gives the same components as joining every edge.
+    """
+    if len(embeddings) == 0:
+        return []
+
+    normalized = normalize(np.asarray(embeddings, dtype=np.float64))
+    shape = normalized.shape
+    n = shape[0]
+    record(items=n)
+    asset_index = AssetIndex.from_tickets(tickets)
+
+    shm = SharedMemory(create=True, size=normalized.nbytes)
+
+    try:
+        np.ndarray(shape, dtype=np.float64, buffer=shm.buf)[:] = normalized
+        del normalized
+
+        with ProcessPoolExecutor(
+            max_workers=worker_count(workers),
+            initializer=_init_worker,
+            initargs=(shm.name, shape, asset_index)
+        ) as pool:
+            starts = range(0, n, block_size)
+            forests = list(pool.map(
+                _block_forest,
+                starts,
+                [max_distance] * len(starts),
+                [block_size] * len(starts)
+            ))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    nodes = [forest[0] for forest in forests]
+    roots = [forest[1] for forest in forests]
+
+    return component_groups(
+        n,
+        np.concatenate(nodes or [np.zeros(0, dtype=np.intp)]),
+        np.concatenate(roots or [np.zeros(0, dtype=np.intp)])
+    )
@@ -0,0 +1,367 @@
+import json
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core.assets import AssetVocabulary
+
+
+# Header fields of display_text, in order, after "Ticket ID"
+HEADER_FIELDS = [
+    "Date Created",
+    "Department",
+    "Assigned To",
+    "Priority",
+    "Status",
+]
+
+TICKET_KEYS = ("ticket_id", "display_text", "embedding_text", "assets")
+
+TABLE_COLUMNS_FILE = "tickets.npz"
+TABLE_VALUES_FILE = "tickets.json"
+
+
+class TicketView(Mapping):
+    """
+    One row of a TicketTable, readable like the old ticket dict:
+    ticket["display_text"], ticket.get("assets"), dict(ticket).
+    display_text is formatted on access rather than stored.
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "TicketTable", index: int):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key):
+        if key == "ticket_id":
+            return self.table.ticket_ids[self.index]
+        if key == "display_text":
+            return self.table.display_text(self.index)
+        if key == "embedding_text":
+            return self.table.descriptions[self.index]
+        if key == "assets":
+            return self.table.assets(self.index)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(TICKET_KEYS)
+
+    def __len__(self):
+        return len(TICKET_KEYS)
+
+    def __repr__(self):
+        return f"TicketView({self.table.ticket_ids[self.index]!r})"
+
+
+class TicketTable(Sequence):
+    """
+    Tickets stored column-wise.
+
+    ticket_ids holds the raw IDs and descriptions the canonical
+    (lower-cased) descriptions. Each header field is dictionary-encoded
+    as (codes, values). Assets are CSR-style (asset_offsets, asset_ids)
+    over vocabulary. display_text is built only when a ticket is shown.
+
+    Indexing returns a TicketView, so code written against a list of
+    ticket dicts keeps working.
+    """
+
+    def __init__(
+        self,
+        ticket_ids: np.ndarray,
+        fields: dict[str, tuple[np.ndarray, np.ndarray]],
+        descriptions: np.ndarray,
+        asset_offsets: np.ndarray,
+        asset_ids: np.ndarray,
+        vocabulary: AssetVocabulary
+    ):
+        self.ticket_ids = ticket_ids
+        self.fields = fields
+        self.descriptions = descriptions
+        self.asset_offsets = asset_offsets
+        self.asset_ids = asset_ids
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.descriptions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ticket index out of range")
+
+        return TicketView(self, index)
+
+    def field(self, name: str, index: int) -> str:
+        codes, values = self.fields[name]
+        return values[codes[index]]
+
+    def display_text(self, index: int) -> str:
+        return (
+            f"Ticket Summary\n"
+            f"--------------\n"
+            f"Ticket ID: {self.ticket_ids[index]}\n"
+            f"Date Created: {self.field('Date Created', index)}\n"
+            f"Department: {self.field('Department', index)}\n"
+            f"Assigned To: {self.field('Assigned To', index)}\n"
+            f"Priority: {self.field('Priority', index)}\n"
+            f"Status: {self.field('Status', index)}\n\n"
+            f"Issue Description:\n"
+            f"{self.descriptions[index]}"
+        )
+
+    def assets(self, index: int) -> list[str]:
+        start, stop = self.asset_offsets[index:index + 2]
+        return [self.vocabulary.assets[a] for a in self.asset_ids[start:stop]]
+
+    def take(self, indices) -> "TicketTable":
+        """
+        A new table with the given rows, sharing this table's vocabulary.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+
+        starts = self.asset_offsets[indices]
+        counts = self.asset_offsets[indices + 1] - starts
+        # Flat positions of every kept asset ID, row by row
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+        return TicketTable(
+            self.ticket_ids[indices],
+            {name: (codes[indices], values) for name, (codes, values) in self.fields.items()},
+            self.descriptions[indices],
+            np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            self.asset_ids[positions],
+            self.vocabulary
+        )
+
+    def to_records(self) -> list[dict]:
+        """
+        The tickets as plain dicts, e.g. for JSON.
+        """
+        return [dict(ticket) for ticket in self]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the columns, strings included.
+        """
+        strings = sum(len(s) + 49 for s in self.descriptions)
+        ids = sum(len(str(t)) + 49 for t in self.ticket_ids)
+        fields = sum(
+            codes.nbytes + sum(len(v) + 49 for v in values)
+            for codes, values in self.fields.values()
+        )
+        return (
+            strings + ids + fields
+            + self.asset_offsets.nbytes + self.asset_ids.nbytes
+            + sum(len(a) + 49 for a in self.vocabulary.assets)
+        )
+
+    def copy(self) -> "TicketTable":
+        """
+        A copy that later extend() calls leave as it is. extend()
+        replaces the column arrays rather than writing into them, so
+        they are shared; only the asset vocabulary is copied.
+        """
+        vocabulary = AssetVocabulary()
+        vocabulary.ids = dict(self.vocabulary.ids)
+        vocabulary.assets = list(self.vocabulary.assets)
+
+        return TicketTable(
+            self.ticket_ids,
+            dict(self.fields),
+            self.descriptions,
+            self.asset_offsets,
+            self.asset_ids,
+            vocabulary
+        )
+
+    def extend(self, other: "TicketTable"):
+        """
+        Append other's rows in place, re-encoding their assets and header
+        fields against this table's vocabulary and field values. Existing
+        rows keep their indices, so views of them stay valid.
+        """
+        if len(other.asset_ids):
+            mapping = np.array(
+                [self.vocabulary.intern(a) for a in other.vocabulary.assets], dtype=np.int64
+            )
+            asset_ids = mapping[other.asset_ids]
+        else:
+            asset_ids = other.asset_ids
+
+        self.asset_ids = np.concatenate([self.asset_ids, asset_ids]).astype(np.int64)
+        self.asset_offsets = np.concatenate(
+            [self.asset_offsets, other.asset_offsets[1:] + self.asset_offsets[-1]]
+        )
+
+        for name, (codes, values) in self.fields.items():
+            other_codes, other_values = other.fields[name]
+            lookup = {value: code for code, value in enumerate(values)}
+            added = []
+            remap = np.empty(len(other_values), dtype=np.int32)
+
+            for k, value in enumerate(other_values):
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(values) + len(added)
+                    added.append(value)
+                remap[k] = code
+
+            self.fields[name] = (
+                np.concatenate([codes, remap[other_codes]]).astype(np.int32),
+                np.concatenate([values, np.array(added, dtype=object)])
+            )
+
+        self.ticket_ids = np.concatenate([self.ticket_ids, other.ticket_ids])
+        self.descriptions = np.concatenate([self.descriptions, other.descriptions])
+
+    def save(self, directory):
+        """
+        Write the columns to directory: the numeric arrays and the
+        UTF-8 descriptions in one .npz, the (small) ID, field value and
+        asset lists as JSON.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        text, text_offsets = _encode_strings(self.descriptions)
+        names = list(self.fields)
+
+        np.savez(
+            directory / TABLE_COLUMNS_FILE,
+            descriptions=text,
+            description_offsets=text_offsets,
+            asset_offsets=self.asset_offsets,
+            asset_ids=self.asset_ids,
+            **{f"codes_{k}": self.fields[name][0] for k, name in enumerate(names)}
+        )
+
+        with open(directory / TABLE_VALUES_FILE, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "ticket_ids": self.ticket_ids.tolist(),
+                    "fields": {name: self.fields[name][1].tolist() for name in names},
+                    "assets": self.vocabulary.assets,
+                },
+                f,
+                default=str
+            )
+
+    @classmethod
+    def load(cls, directory) -> "TicketTable":
+        """
+        Read a table written by save().
+        """
+        directory = Path(directory)
+
+        with open(directory / TABLE_VALUES_FILE, "r", encoding="utf-8") as f:
+            values = json.load(f)
+
+        vocabulary = AssetVocabulary()
+        for asset in values["assets"]:
+            vocabulary.intern(asset)
+
+        with np.load(directory / TABLE_COLUMNS_FILE) as columns:
+            return cls(
+                _object_array(values["ticket_ids"]),
+                {
+                    name: (columns[f"codes_{k}"], _object_array(field_values))
+                    for k, (name, field_values) in enumerate(values["fields"].items())
+                },
+                _decode_strings(columns["descriptions"], columns["description_offsets"]),
+                columns["asset_offsets"],
+                columns["asset_ids"],
+                vocabulary
+            )
+
+    @classmethod
+    def concat(cls, tables: list["TicketTable"]) -> "TicketTable":
+        """
+        Stack tables (e.g. streamed chunks), merging their vocabularies
+        and field dictionaries.
+        """
+        if not tables:
+            return cls.empty()
+
+        vocabulary = AssetVocabulary()
+        asset_ids = []
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+
+        for table in tables:
+            mapping = np.array(
+                [vocabulary.intern(a) for a in table.vocabulary.assets], dtype=np.int64
+            )
+            asset_ids.append(mapping[table.asset_ids] if len(table.asset_ids) else table.asset_ids)
+            offsets.append(table.asset_offsets[1:] + base)
+            base += table.asset_offsets[-1]
+
+        fields = {}
+        for name in tables[0].fields:
+            decoded = np.concatenate([
+                table.fields[name][1][table.fields[name][0]] for table in tables
+            ])
+            fields[name] = encode_column(decoded)
+
+        return cls(
+            np.concatenate([table.ticket_ids for table in tables]),
+            fields,
+            np.concatenate([table.descriptions for table in tables]),
+            np.concatenate(offsets),
+            np.concatenate(asset_ids).astype(np.int64),
+            vocabulary
+        )
+
+    @classmethod
+    def empty(cls) -> "TicketTable":
+        none = np.zeros(0, dtype=object)
+        codes = np.zeros(0, dtype=np.int32)
+
+        return cls(
+            none,
+            {name: (codes, none) for name in HEADER_FIELDS},
+            none,
+            np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int64),
+            AssetVocabulary()
+        )
+
+
+def encode_column(values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Dictionary-encode a column of strings as (int32 codes, unique values).
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return codes.astype(np.int32), np.asarray(uniques, dtype=object)
+
+
+def _object_array(values: list) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _encode_strings(strings) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Strings as one UTF-8 byte array plus (len + 1) offsets into it.
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    raw = data.tobytes()
+    return _object_array([
+        raw[start:stop].decode("utf-8") for start, stop in zip(offsets[:-1], offsets[1:])
+    ])
@@ -2,8 +2,6 @@ import pandas as pd
 import random
 from datetime import datetime, timedelta
 
-random.seed(42)
-
 # ----------------------------
 # Constants
 # ----------------------------
@@ -45,48 +43,59 @@ PRIORITIES = [1, 2, 3, 4]
 SEVERITIES = ["Critical", "High", "Medium", "Low"]
 STATUSES = ["Open", "Resolved", "Closed", "In Progress"]
 
-start_date = datetime(2025, 2, 1)
+START_DATE = datetime(2025, 2, 1)
+ASSIGNEES = ["Alice Morgan", "Rahul Desai", "Meera Iyer", "Daniel Shah"]
+OUTPUT_PATH = "iam_test_dataset_220.xlsx"
+
 
-rows = []
+def build_dataset(rows: int = 220, seed: int = 42) -> pd.DataFrame:
+    """
+    The IAM test workbook as a DataFrame. The defaults reproduce
+    iam_test_dataset_220.xlsx.
+    """
+    random.seed(seed)
+    records = []
 
-for i in range(1, 221):
+    for i in range(1, rows + 1):
 
-    asset_name, ip, group = random.choice(ASSETS)
-    theme = random.choice(IAM_THEMES)
-    user = random.choice(USERS)
+        asset_name, ip, group = random.choice(ASSETS)
+        theme = random.choice(IAM_THEMES)
+        user = random.choice(USERS)
 
-    opened = start_date + timedelta(hours=random.randint(0, 720))
-    resolved = opened + timedelta(hours=random.randint(1, 6))
-    closed = resolved + timedelta(minutes=random.randint(10, 45))
+        opened = START_DATE + timedelta(hours=random.randint(0, 720))
+        resolved = opened + timedelta(hours=random.randint(1, 6))
+        closed = resolved + timedelta(minutes=random.randint(10, 45))
 
-    description = f"""
+        description = f"""
     Incident involving {theme}.
     Affected asset: {asset_name}.
     Source IP: {ip}.
     User reported: {user}.
     URL https://{asset_name}/auth returned errors intermittently.
-    """
-
-    rows.append({
-        "Incident ID": f"INC{100000 + i}",
-        "Opened At": opened.strftime("%Y-%m-%d %H:%M:%S"),
-        "Short Description": theme,
-        "Description": description.strip(),
-        "Priority": random.choice(PRIORITIES),
-        "Severity": random.choice(SEVERITIES),
-        "Status": random.choice(STATUSES),
-        "Resolved At": resolved.strftime("%Y-%m-%d %H:%M:%S"),
-        "Closed At": closed.strftime("%Y-%m-%d %H:%M:%S"),
-        "Assigned To": random.choice(["Alice Morgan", "Rahul Desai", "Meera Iyer", "Daniel Shah"]),
-        "Assignment Group": group,
-        "Resolution Notes": "Service restarted and logs reviewed.",
-        "Category": "IAM",
-        "Configuration Item": asset_name,
-        "Environment": "Production"
-    })
-
-df = pd.DataFrame(rows)
-
-df.to_excel("iam_test_dataset_220.xlsx", index=False)
-
-print("Dataset generated: iam_test_dataset_220.xlsx")
+        """
+
+        records.append({
+            "Incident ID": f"INC{100000 + i}",
+            "Opened At": opened.strftime("%Y-%m-%d %H:%M:%S"),
+            "Short Description": theme,
+            "Description": description.strip(),
+            "Priority": random.choice(PRIORITIES),
+            "Severity": random.choice(SEVERITIES),
+            "Status": random.choice(STATUSES),
+            "Resolved At": resolved.strftime("%Y-%m-%d %H:%M:%S"),
+            "Closed At": closed.strftime("%Y-%m-%d %H:%M:%S"),
+            "Assigned To": random.choice(ASSIGNEES),
+            "Assignment Group": group,
+            "Resolution Notes": "Service restarted and logs reviewed.",
+            "Category": "IAM",
+            "Configuration Item": asset_name,
+            "Environment": "Production"
+        })
+
+    return pd.DataFrame(records)
+
+
+if __name__ == "__main__":
+    build_dataset().to_excel(OUTPUT_PATH, index=False)
+
+    print(f"Dataset generated: {OUTPUT_PATH}")
@@ -1,70 +1,125 @@
-import os
-import json
+import argparse
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from core.loader import load_excel_tickets
-from core.embeddings import embed_texts
-from core.grouping import group_by_similarity
-from core.analysis import analyse_group
+from core.embedding_cache import EmbeddingCache
+from core.analysis import analyse_groups
+from core.analysis_cache import AnalysisCache
+from core.instrumentation import PROFILERS, RunReport, activate
+from core.offline_store import DEFAULT_STORE_PATH, write_offline_store
+from core.pipeline import add_pipeline_arguments, group_tickets, load_export
 
 DATA_PATH = "data/raw/test_service_tickets.xlsx"
 MAX_DISTANCE = 0.35
 MAX_DESCRIPTIONS_PER_GROUP = 8
-OUTPUT_PATH = "data/offline/offline_results.json"
+OUTPUT_PATH = DEFAULT_STORE_PATH
+
+
+def offline_group(group_number: int, group: list[int], tickets: list[dict], analysis) -> dict:
+    """
+    One group of offline results, in the shape write_offline_store takes.
+    """
+    return {
+        "group_number": group_number,
+        "tickets": [
+            {
+                "display_text": tickets[i]["display_text"],
+                "embedding_text": tickets[i]["embedding_text"]
+            }
+            for i in group
+        ],
+        "analysis": analysis
+    }
+
+
+def write_offline_results(results, path=OUTPUT_PATH):
+    """
+    Write groups (a list or any iterable, e.g. as they are analysed)
+    to the indexed offline store app.py reads.
+    """
+    return write_offline_store(results, path)
 
 
 def main():
-    print("Loading tickets...")
-    tickets = load_excel_tickets(DATA_PATH)
-    print(f"{len(tickets)} tickets loaded")
+    parser = argparse.ArgumentParser(description="Pre-generate offline analysis results.")
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="re-run the LLM for every group instead of reusing cached analyses"
+    )
+    parser.add_argument("--profile", choices=PROFILERS, help="profile each pipeline stage")
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="record per-stage peak Python allocations (slower)"
+    )
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
 
-    print("Generating embeddings...")
-    embedding_texts = [t["embedding_text"] for t in tickets]
-    embeddings = embed_texts(embedding_texts)
-    print("Embeddings generated")
+    report = RunReport("offline", trace_memory=args.trace_memory, profile=args.profile)
 
-    print("Grouping tickets...")
-    groups, _ = group_by_similarity(embeddings, MAX_DISTANCE)
+    with activate(report):
+        generate(report, args.refresh, dedup=not args.no_dedup, workers=args.workers)
+
+    print(report.summary())
+    print(f"Run report written to {report.save()}")
 
-    meaningful_groups = [g for g in groups if len(g) > 1]
-    print(f"{len(meaningful_groups)} meaningful groups found")
 
-    results = []
+def generate(report: RunReport, refresh: bool, dedup: bool = True, workers: int = 1):
 
-    for idx, group in enumerate(meaningful_groups, start=1):
-        print(f"Analysing Group {idx}")
+    print("Loading tickets...")
+    with report.stage("load"):
+        tickets = load_export(DATA_PATH, workers)
+    print(f"{len(tickets)} tickets loaded")
+
+    result = group_tickets(
+        tickets,
+        MAX_DISTANCE,
+        report,
+        dedup=dedup,
+        workers=workers,
+        embedding_cache=EmbeddingCache(),
+        progress=lambda step: print(f"{step.capitalize()} tickets...")
+    )
+    distinct = len(result.duplicates)
+    print(
+        f"{distinct} distinct tickets embedded "
+        f"({result.embeddings_cached} cached, {distinct - result.embeddings_cached} requested)"
+    )
+
+    meaningful_groups = [g for g in result.groups if len(g) > 1]
+    print(f"{len(meaningful_groups)} meaningful groups found")
 
-        descriptions = [
-            tickets[i]["embedding_text"]
-            for i in group[:MAX_DESCRIPTIONS_PER_GROUP]
-        ]
+    # Diverse tickets per group, within the prompt token budget
+    descriptions_per_group = result.descriptions(
+        meaningful_groups,
+        lambda i: tickets[i]["embedding_text"],
+        max_items=MAX_DESCRIPTIONS_PER_GROUP
+    )
 
-        analysis = analyse_group(descriptions)
+    analysis_cache = AnalysisCache()
 
-        group_data = {
-            "group_number": idx,
-            "tickets": [
-                {
-                    "display_text": tickets[i]["display_text"],
-                    "embedding_text": tickets[i]["embedding_text"]
-                }
-                for i in group
-            ],
-            "analysis": analysis
-        }
+    def analysed_groups():
+        for index, analysis, error in analyse_groups(
+            descriptions_per_group, cache=analysis_cache, refresh=refresh
+        ):
+            print(f"Analysed Group {index + 1}")
 
-        results.append(group_data)
+            if error is not None:
+                print(f"Group {index + 1} failed: {error}")
+                analysis = {"error": "LLM request failed", "raw_response": str(error)}
 
-    print("Saving offline results...")
+            yield offline_group(index + 1, meaningful_groups[index], tickets, analysis)
 
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    # Groups are written as their analyses complete, not held until the end
+    with report.stage("analyse"):
+        path = write_offline_results(analysed_groups())
 
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=4)
+    cached = analysis_cache.stats()["hits"]
+    print(f"Analyses: {cached} cached, {len(meaningful_groups) - cached} requested")
 
-    print("Offline results saved successfully!")
+    print(f"Offline results saved to {path}")
 
 
 if __name__ == "__main__":
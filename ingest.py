@@ -0,0 +1,95 @@
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.loader import load_tickets
+from core.embeddings import embed_texts, get_backend
+from core.embedding_cache import EmbeddingCache
+from core.incremental import IncrementalGrouper, DEFAULT_STATE_DIR
+from core.analysis import analyse_groups
+from core.analysis_cache import AnalysisCache
+from core.representatives import group_descriptions
+
+MAX_DISTANCE = 0.35
+MAX_DESCRIPTIONS_PER_GROUP = 8
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Add new tickets from an export to the saved groups."
+    )
+    parser.add_argument("path", help="ticket export (.xlsx, .csv or .parquet)")
+    parser.add_argument("--state-dir", default=str(DEFAULT_STATE_DIR))
+    parser.add_argument(
+        "--analyse",
+        action="store_true",
+        help="re-analyse the groups whose membership changed"
+    )
+    args = parser.parse_args()
+
+    grouper = IncrementalGrouper.load(args.state_dir, MAX_DISTANCE)
+    print(f"{len(grouper)} tickets in saved state")
+
+    backend = get_backend()
+    saved_model = grouper.retriever.model if grouper.retriever is not None else None
+    if saved_model not in (None, backend.model):
+        parser.error(
+            f"saved state was embedded with {saved_model!r}, not {backend.model!r}; "
+            "set EMBEDDING_BACKEND to match"
+        )
+
+    known = set(grouper.tickets.ticket_ids.tolist())
+    loaded = load_tickets(args.path)
+    tickets = loaded.take([
+        i for i, ticket_id in enumerate(loaded.ticket_ids)
+        if ticket_id is None or ticket_id not in known
+    ])
+    print(f"{len(tickets)} new tickets")
+
+    if tickets:
+        embeddings = embed_texts(
+            [t["embedding_text"] for t in tickets],
+            cache=EmbeddingCache(),
+            backend=backend
+        )
+        grouper.ingest(tickets, embeddings)
+        grouper.retriever.model = backend.model
+
+    changed = [g for g in grouper.changed_groups() if len(g) > 1]
+    print(f"{len(changed)} groups changed")
+
+    if args.analyse and changed:
+        descriptions_per_group = group_descriptions(
+            changed,
+            lambda i: grouper.tickets[i]["embedding_text"],
+            grouper.retriever.embeddings,
+            max_items=MAX_DESCRIPTIONS_PER_GROUP
+        )
+
+        analysed = []
+
+        for index, analysis, error in analyse_groups(
+            descriptions_per_group, cache=AnalysisCache()
+        ):
+            if error is not None:
+                print(f"Group of ticket {changed[index][0]} failed: {error}")
+                continue
+
+            # Unparseable responses leave the group to be retried next run
+            if "error" in analysis:
+                print(f"Group of ticket {changed[index][0]} failed: {analysis['error']}")
+                continue
+
+            label = analysis.get("group_label", "No label")
+            print(f"Group of ticket {changed[index][0]} ({len(changed[index])} tickets): {label}")
+            analysed.append(changed[index])
+
+        grouper.mark_analysed(analysed)
+
+    grouper.save()
+    print(f"State saved to {args.state_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import argparse
 import json
 
-from core.loader import load_excel_tickets
-from core.embeddings import embed_texts
-from core.grouping import group_by_similarity
-from core.analysis import analyse_group
+from core.embedding_cache import EmbeddingCache
+from core.analysis import analyse_groups
+from core.pipeline import add_pipeline_arguments, group_tickets, load_export
+from core.instrumentation import PROFILERS, RunReport, activate
 
 DATA_PATH = "data/raw/test_service_tickets.xlsx"
 MAX_DISTANCE = 0.35
@@ -14,39 +15,81 @@ MAX_DESCRIPTIONS_PER_GROUP = 10
 
 
 def main():
-    print("\n=== LOADING TICKETS ===\n")
-    tickets = load_excel_tickets(DATA_PATH)
-    print(f"Loaded {len(tickets)} tickets\n")
+    parser = argparse.ArgumentParser(description="Group and analyse service tickets.")
+    parser.add_argument("--profile", choices=PROFILERS, help="profile each pipeline stage")
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="record per-stage peak Python allocations (slower)"
+    )
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    report = RunReport("main", trace_memory=args.trace_memory, profile=args.profile)
+
+    with activate(report):
+        run(report, dedup=not args.no_dedup, workers=args.workers)
 
-    print("=== GENERATING EMBEDDINGS ===\n")
-    embedding_texts = [t["embedding_text"] for t in tickets]
-    embeddings = embed_texts(embedding_texts)
-    print("Embeddings generated\n")
+    print("\n=== STAGE TIMINGS ===\n")
+    print(report.summary())
+    print(f"\nRun report written to {report.save()}")
 
-    print("=== GROUPING TICKETS (Description-only similarity) ===\n")
-    groups, _ = group_by_similarity(embeddings, MAX_DISTANCE)
 
-    meaningful_groups = [g for g in groups if len(g) > 1]
+def run(report: RunReport, dedup: bool = True, workers: int = 1):
+    print("\n=== LOADING TICKETS ===\n")
+    with report.stage("load"):
+        tickets = load_export(DATA_PATH, workers)
+    print(f"Loaded {len(tickets)} tickets\n")
+
+    result = group_tickets(
+        tickets,
+        MAX_DISTANCE,
+        report,
+        dedup=dedup,
+        workers=workers,
+        embedding_cache=EmbeddingCache(),
+        progress=lambda step: print(f"=== {step.upper()} TICKETS ===\n")
+    )
+    distinct = len(result.duplicates)
+    print(
+        f"{distinct} distinct tickets embedded "
+        f"({result.embeddings_cached} cached, {distinct - result.embeddings_cached} requested)\n"
+    )
+
+    meaningful_groups = [g for g in result.groups if len(g) > 1]
     print(f"Found {len(meaningful_groups)} meaningful groups\n")
 
-    enriched_groups = []
+    # Diverse tickets per group, within the prompt token budget
+    descriptions_per_group = result.descriptions(
+        meaningful_groups,
+        lambda i: tickets[i]["display_text"],
+        max_items=MAX_DESCRIPTIONS_PER_GROUP
+    )
 
-    for idx, group in enumerate(meaningful_groups, start=1):
-        print(f"Analysing group {idx}/{len(meaningful_groups)}")
+    analyses = [None] * len(meaningful_groups)
 
-        descriptions = [
-            tickets[i]["display_text"]
-            for i in group[:MAX_DESCRIPTIONS_PER_GROUP]
-        ]
+    with report.stage("analyse"):
+        for done, (index, analysis, error) in enumerate(
+            analyse_groups(descriptions_per_group), start=1
+        ):
+            if error is not None:
+                print(f"Group {index + 1} failed: {error}")
+                analysis = {"error": "LLM request failed", "raw_response": str(error)}
 
-        analysis = analyse_group(descriptions)
+            print(f"Analysed group {index + 1} ({done}/{len(meaningful_groups)})")
+            analyses[index] = analysis
 
-        enriched_groups.append({
+    enriched_groups = [
+        {
             "group_id": idx,
             "ticket_indices": group,
             "analysis": analysis,
             "tickets": [tickets[i] for i in group]
-        })
+        }
+        for idx, (group, analysis) in enumerate(
+            zip(meaningful_groups, analyses), start=1
+        )
+    ]
 
     print("\n=== LLM ANALYSIS COMPLETE ===\n")
 
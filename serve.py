@@ -0,0 +1,87 @@
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.embeddings import get_backend
+from core.embedding_cache import EmbeddingCache
+from core.incremental import IncrementalGrouper, DEFAULT_STATE_DIR
+from core.analysis_cache import AnalysisCache
+from core.service import (
+    INGEST_BATCH_SIZE,
+    INGEST_BATCH_WAIT,
+    QUEUE_SIZE,
+    SAVE_INTERVAL,
+    TicketService,
+    create_app,
+)
+
+MAX_DISTANCE = 0.35
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve ticket ingest, similarity and group analysis over HTTP."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--state-dir", default=str(DEFAULT_STATE_DIR))
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=INGEST_BATCH_SIZE,
+        help="tickets embedded and grouped together"
+    )
+    parser.add_argument(
+        "--batch-wait",
+        type=float,
+        default=INGEST_BATCH_WAIT,
+        help="seconds a partial batch waits for more tickets"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=QUEUE_SIZE,
+        help="queued tickets or queries before requests are refused with 503"
+    )
+    parser.add_argument(
+        "--save-interval",
+        type=float,
+        default=SAVE_INTERVAL,
+        help="seconds between saves of newly ingested tickets (0 = only on shutdown)"
+    )
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("serving needs uvicorn: pip install uvicorn")
+
+    grouper = IncrementalGrouper.load(args.state_dir, MAX_DISTANCE)
+    print(f"{len(grouper)} tickets in saved state")
+
+    backend = get_backend()
+    saved_model = grouper.retriever.model if grouper.retriever is not None else None
+    if saved_model not in (None, backend.model):
+        parser.error(
+            f"saved state was embedded with {saved_model!r}, not {backend.model!r}; "
+            "set EMBEDDING_BACKEND to match"
+        )
+
+    service = TicketService(
+        grouper,
+        backend,
+        embedding_cache=EmbeddingCache(),
+        analysis_cache=AnalysisCache(),
+        ingest_batch_size=args.batch_size,
+        ingest_batch_wait=args.batch_wait,
+        queue_size=args.queue_size,
+        save_interval=args.save_interval or None
+    )
+
+    # One worker process: the groups and index live in this process's memory
+    uvicorn.run(create_app(service), host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()